@@ -1,32 +1,505 @@
 import os
+import sys
 import json
+import time
+import hashlib
+import atexit
+import threading
+import concurrent.futures
+from collections import OrderedDict
+from dataclasses import dataclass
 from ax.api.client import Client
 # UPDATED IMPORTS:
 from ax.api.configs import RangeParameterConfig, ChoiceParameterConfig
 from ax.core.parameter import ParameterType, RangeParameter, ChoiceParameter
 from ax.core.search_space import SearchSpace
-from benchmarks import (ackley,rosenbrock,rastrigin,sphere,beale)
-
-BENCHMARK_REGISTRY = {
-    "ackley": ackley,
-    "rosenbrock": rosenbrock,
-    "rastrigin": rastrigin,
-    "sphere": sphere,
-    "beale": beale
-}
+from ax.core.trial_status import TrialStatus
+from ax.adapter.registry import Generators
+from ax.generation_strategy.generation_strategy import GenerationStrategy, GenerationStep
+from botorch.acquisition.knowledge_gradient import qMultiFidelityKnowledgeGradient
+from botorch.acquisition.max_value_entropy_search import qMultiFidelityMaxValueEntropy
+from botorch.acquisition.input_constructors import ACQF_INPUT_CONSTRUCTOR_REGISTRY
+import benchmarks
+import eval_cache
+from trial_history import clean_name
+from study_storage import make_storage
+from study_locks import StudyLock
+from metrics import metrics
+
+BENCHMARK_REGISTRY = benchmarks.REGISTRY
 EXPERIMENT_DIR = "ax_experiments"
 os.makedirs(EXPERIMENT_DIR, exist_ok=True)
+# "json" rewrites the whole study on every save, "trial_log" appends finished
+# trials to <study>.trials.jsonl and snapshots periodically (see study_storage.py).
+STORAGE_BACKEND = "trial_log"
+# Write snapshots as <study>.json.gz. Uncompressed <study>.json files from older
+# versions are still read and get replaced by .json.gz on their next snapshot.
+STUDY_COMPRESSION = True
+# AX_MCP_FILE_LOCKS=1 also takes an OS file lock per study (ax_experiments/<study>.lock)
+# so several server processes (e.g. several stdio runners started in the same directory)
+# can share it. Dirty studies are then flushed whenever the lock is released, i.e. after
+# every tool call, so it is off by default: one process (or one shared server, see
+# README) keeps the write-behind cache.
+STUDY_FILE_LOCKS = os.environ.get("AX_MCP_FILE_LOCKS", "0") == "1"
+
+# Live Client cache. Sizes are measured as the uncompressed size of the study files,
+# which is a cheap (if rough) proxy for how heavy the deserialized Client is.
+CLIENT_CACHE_MAX_ENTRIES = 8
+CLIENT_CACHE_MAX_BYTES = 64 * 1024 * 1024
+CLIENT_CACHE_IDLE_SECONDS = 30 * 60   # evict studies untouched for this long (None = never)
+CLIENT_FLUSH_INTERVAL_SECONDS = 30.0  # write-behind interval (None = write through)
+
+# Objective evaluation. One worker keeps everything in the calling thread.
+EVAL_MAX_WORKERS = 1
+EVAL_EXECUTOR = "thread"   # "thread" or "process"
+EVAL_MAX_WORKERS_LIMIT = 32   # ceiling on a caller's max_workers (process pools also stop at the CPU count)
+EVAL_BATCH_TIMEOUT_SECONDS = None  # trials not started by then are cancelled, running ones finish in the background
+
+# create_study generation_method values. "default" leaves Ax's own choice; the others are
+# passed to Client.configure_generation_strategy. "fast" keeps the GP cheap to fit and
+# "random_search" skips modelling entirely, which is what high-dimensional studies want.
+GENERATION_METHODS = ("default", "fast", "quality", "random_search")
+
+# Studies on a multi-fidelity benchmark ("<name>_mf") get a fidelity parameter and, unless
+# generation_method is "random_search", Sobol followed by a cost-aware multi-fidelity
+# acquisition. Ax's default acquisition (qLogNEI) cannot handle fidelity parameters.
+MULTI_FIDELITY_ACQF = "kg"   # "kg" (knowledge gradient, better) or "mes" (max-value entropy, faster)
+MULTI_FIDELITY_SOBOL_TRIALS = 5
+MULTI_FIDELITY_FANTASIES = 16
+
+# create_study strategy profiles. A profile is stored with the study (in the experiment's
+# properties) and applies to every later get_next_trials call:
+#   warmup_trials        Sobol trials before the model takes over (None = Ax's default)
+#   batch_size           trials per acquisition; bigger requests are split into several
+#                        smaller joint optimizations, which is much faster than one large q
+#   time_budget_seconds  once generating for one call has taken this long, the remaining
+#                        trials are drawn quasi-randomly. It is checked before each batch
+#                        (batches of BUDGETED_BATCH_SIZE if batch_size isn't set), so the
+#                        batch in flight when it runs out can overrun it.
+#   generation_method    forced generation_method; "random_search" is pure Sobol
+# Explicit create_study arguments override the profile's values.
+STRATEGY_PROFILES = {
+    "default": {},
+    "throughput": {"warmup_trials": 8, "batch_size": 4, "time_budget_seconds": 10.0},
+    "quasi_random": {"generation_method": "random_search"},
+}
+PROFILE_PROPERTY = "strategy_profile"
+BUDGETED_BATCH_SIZE = 1
+
+
+def _accept_pending_points(acqf_class):
+    """
+    Let BoTorch's input constructor for `acqf_class` take X_pending. Ax passes the study's
+    running trials as X_pending whenever there are any (several trials in one call, queued
+    trials, the Sobol-to-model transition), but BoTorch's multi-fidelity constructors reject
+    the argument even though the acquisition functions themselves accept it.
+    """
+    constructor = ACQF_INPUT_CONSTRUCTOR_REGISTRY[acqf_class]
+    if getattr(constructor, "accepts_pending_points", False):
+        return
+
+    def construct(*args, X_pending=None, **kwargs):
+        inputs = constructor(*args, **kwargs)
+        if X_pending is not None:
+            inputs["X_pending"] = X_pending
+        return inputs
+
+    construct.accepts_pending_points = True
+    ACQF_INPUT_CONSTRUCTOR_REGISTRY[acqf_class] = construct
+
+
+for _acqf_class in (qMultiFidelityKnowledgeGradient, qMultiFidelityMaxValueEntropy):
+    _accept_pending_points(_acqf_class)
+
+
+@dataclass
+class _CacheEntry:
+    client: Client
+    size: int
+    mtime: int
+    last_used: float
+    dirty: bool = False
+
+
+class ClientCache:
+    """
+    Bounded LRU of deserialized Ax Clients keyed by study name, as clean_name reduces it
+    for the study's files (so "foo" and "foo!" share one entry, like they share files).
+    Saves are write-behind: entries are marked dirty and flushed on eviction,
+    every flush_interval seconds and at shutdown.
+    Flushing a study takes its lock from lock_for(name) so a Client is never
+    serialized while another thread is modifying it. Eviction and the interval
+    flush only try that lock and skip busy studies, so they never wait on a
+    tool call.
+    """
+    def __init__(self, storage, lock_for=None, max_entries=CLIENT_CACHE_MAX_ENTRIES,
+                 max_bytes=CLIENT_CACHE_MAX_BYTES, idle_seconds=CLIENT_CACHE_IDLE_SECONDS,
+                 flush_interval=CLIENT_FLUSH_INTERVAL_SECONDS):
+        self.storage = storage
+        self.lock_for = lock_for or (lambda name: threading.RLock())
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.idle_seconds = idle_seconds
+        self.flush_interval = flush_interval
+        self._entries: "OrderedDict[str, _CacheEntry]" = OrderedDict()
+        self._lock = threading.RLock()
+        self._stop = threading.Event()
+        self._flusher = None
+        if flush_interval:
+            self._flusher = threading.Thread(target=self._flush_loop, name="ax-client-flusher", daemon=True)
+            self._flusher.start()
+
+    def get(self, name: str) -> Client:
+        name = clean_name(name)
+        mtime = self.storage.mtime(name)
+        with self._lock:
+            entry = self._entries.get(name)
+            if entry is not None and mtime is not None and mtime != entry.mtime:
+                if entry.dirty:
+                    # Someone edited the file while we hold unsaved trials; ours wins.
+                    print(f"[ax_manager] '{name}' changed on disk while it has unsaved changes; "
+                          "keeping the in-memory study.", file=sys.stderr)
+                else:
+                    del self._entries[name]
+                    entry = None
+            if entry is not None:
+                entry.last_used = time.monotonic()
+                self._entries.move_to_end(name)
+                metrics.incr("client_cache_hit", name)
+                return entry.client
+        if mtime is None:
+            raise ValueError(f"Experiment '{name}' not found.")
+        metrics.incr("client_cache_miss", name)
+        # deserialize outside the cache lock so other studies aren't held up
+        with metrics.timer("load", name):
+            client = self.storage.load(name)
+        with self._lock:
+            entry = _CacheEntry(client=client, size=self.storage.size(name),
+                                mtime=self.storage.mtime(name), last_used=time.monotonic())
+            self._entries[name] = entry
+            self._entries.move_to_end(name)
+        self._evict()
+        return client
+
+    def put(self, name: str, client: Client, dirty: bool = True):
+        name = clean_name(name)
+        with self._lock:
+            entry = self._entries.get(name)
+            if entry is None:
+                entry = _CacheEntry(client=client, size=self.storage.size(name),
+                                    mtime=self.storage.mtime(name), last_used=time.monotonic())
+                self._entries[name] = entry
+            entry.client = client
+            entry.dirty = entry.dirty or dirty
+            entry.last_used = time.monotonic()
+            self._entries.move_to_end(name)
+        if entry.dirty and not self.flush_interval:
+            self.flush(name)
+        self._evict()
+
+    def contains(self, name: str) -> bool:
+        with self._lock:
+            return clean_name(name) in self._entries
+
+    def discard(self, name: str):
+        """Drop `name` without writing it back (its files are being moved away)."""
+        with self._lock:
+            self._entries.pop(clean_name(name), None)
+
+    def flush(self, name: str = None, blocking: bool = True):
+        """Write dirty entries (or just `name`) to disk. Non-blocking skips studies in use."""
+        with self._lock:
+            names = [clean_name(name)] if name is not None else list(self._entries)
+        for n in names:
+            lock = self.lock_for(n)
+            if not lock.acquire(blocking=blocking):
+                continue
+            try:
+                with self._lock:
+                    entry = self._entries.get(n)
+                if entry is not None and entry.dirty:
+                    self._flush_entry(n, entry)
+            finally:
+                lock.release()
+
+    def close(self):
+        self._stop.set()
+        if self._flusher is not None:
+            self._flusher.join(timeout=5)
+        self.flush()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "bytes": sum(e.size for e in self._entries.values()),
+                "dirty": [n for n, e in self._entries.items() if e.dirty],
+            }
+
+    def _flush_entry(self, name, entry):
+        with metrics.timer("save", name):
+            self.storage.save(name, entry.client)
+        entry.dirty = False
+        entry.mtime = self.storage.mtime(name)
+        entry.size = self.storage.size(name)
+
+    def _victims(self) -> list[tuple[str, _CacheEntry]]:
+        """LRU-first entries to drop: idle ones, then enough to get back under budget."""
+        now = time.monotonic()
+        count = len(self._entries)
+        total = sum(e.size for e in self._entries.values())
+        newest = next(reversed(self._entries), None)
+        victims = []
+        for name, entry in self._entries.items():
+            # never evict the entry that was just touched
+            if name == newest:
+                break
+            idle = self.idle_seconds is not None and now - entry.last_used > self.idle_seconds
+            if idle or count > self.max_entries or total > self.max_bytes:
+                victims.append((name, entry))
+                count -= 1
+                total -= entry.size
+        return victims
+
+    def _evict(self):
+        with self._lock:
+            victims = self._victims()
+        for name, entry in victims:
+            lock = self.lock_for(name)
+            if not lock.acquire(blocking=False):
+                continue  # in use; try again next time
+            try:
+                if entry.dirty:
+                    self._flush_entry(name, entry)
+                with self._lock:
+                    if self._entries.get(name) is entry:
+                        del self._entries[name]
+            finally:
+                lock.release()
+
+    def _flush_loop(self):
+        while not self._stop.wait(self.flush_interval):
+            try:
+                self.flush(blocking=False)
+                self._evict()
+            except Exception as e:
+                print(f"[ax_manager] background flush failed: {e}", file=sys.stderr)
+
 
 class AxStateManager:
+    def __init__(self, storage: str = STORAGE_BACKEND, cache: bool = True, file_locks: bool = STUDY_FILE_LOCKS,
+                 evaluation_cache: bool = True, compress: bool = STUDY_COMPRESSION, **cache_options):
+        self.storage = make_storage(storage, EXPERIMENT_DIR, compress)
+        # memoized objective values shared with evaluate_benchmark (None: always evaluate)
+        self.eval_cache = eval_cache.default_cache() if evaluation_cache else None
+        self.file_locks = file_locks
+        self._study_locks: dict[str, StudyLock] = {}
+        self._study_locks_guard = threading.Lock()
+        # study name -> (trial data fingerprint, get_best_parameterization() result)
+        self._best_cache: dict[str, tuple[str, tuple]] = {}
+        self.cache = None
+        if cache:
+            self.cache = ClientCache(self.storage, lock_for=self.study_lock, **cache_options)
+            atexit.register(self.close)
+
+    def close(self):
+        """Flush any write-behind state to disk."""
+        if self.cache is not None:
+            self.cache.close()
+
     def _get_filepath(self, name: str) -> str:
-        clean_name = "".join(c for c in name if c.isalnum() or c in (' ', '_', '-')).strip()
-        return os.path.join(EXPERIMENT_DIR, f"{clean_name}.json")
+        return self.storage.path(name)
+
+    def release_study(self, name: str):
+        """
+        Write `name` out and forget it, so its files can be archived. The caller holds
+        study_lock(name); loading the study again reads it back from disk.
+        """
+        name = clean_name(name)
+        if self.cache is not None:
+            if self.cache.contains(name):
+                self.cache.flush(name)
+            self.cache.discard(name)
+        self._best_cache.pop(name, None)
+        self.storage.forget(name)
+
+    def study_lock(self, name: str) -> StudyLock:
+        """
+        Hold this around load_client ... save_client so concurrent updates don't interleave.
+        Names that map to the same files (see clean_name) share a lock.
+        """
+        name = clean_name(name)
+        with self._study_locks_guard:
+            if name not in self._study_locks:
+                lock_path, on_release = None, None
+                if self.file_locks:
+                    lock_path = self.storage.lock_path(name)
+                    if self.cache is not None:
+                        on_release = lambda: self.cache.flush(name)
+                self._study_locks[name] = StudyLock(lock_path, on_release)
+            return self._study_locks[name]
+
+    @staticmethod
+    def check_objective(client: Client, objective: str):
+        """Refuse to complete a study's trials with another function's values."""
+        metric = client._experiment.optimization_config.objective.metric_names[0]
+        if objective != metric:
+            raise ValueError(f"Study objective is '{metric}', not '{objective}'.")
+
+    @staticmethod
+    def data_fingerprint(client: Client) -> str:
+        """Hash of every trial's status and observed data; changes whenever a trial finishes."""
+        experiment = client._experiment
+        h = hashlib.sha1()
+        for index, trial in sorted(experiment.trials.items()):
+            h.update(f"{index}:{trial.status.name};".encode())
+        df = experiment.lookup_data().df
+        if len(df):
+            cols = df[["trial_index", "metric_name", "mean", "sem"]].sort_values(["trial_index", "metric_name"])
+            h.update(cols.to_csv(index=False).encode())
+        return h.hexdigest()
+
+    def get_best_parameterization(self, name: str, client: Client) -> tuple:
+        """
+        client.get_best_parameterization(), cached per study until new trial data arrives.
+        With a fitted model Ax cross-validates it on every call, which is the slow part of
+        provide_best_parameters; the fit itself lives on the Client's generation strategy,
+        which ClientCache keeps alive so Ax refits it warm-started from the previous
+        hyperparameters (warm_start_refit) when a few trials are added.
+        """
+        name = clean_name(name)
+        key = self.data_fingerprint(client)
+        cached = self._best_cache.get(name)
+        if cached is not None and cached[0] == key:
+            metrics.incr("best_cache_hit", name)
+            return cached[1]
+        with metrics.timer("best_point", name):
+            result = client.get_best_parameterization()
+        self._best_cache[name] = (key, result)
+        return result
+
+    @staticmethod
+    def is_minimize(client: Client) -> bool:
+        return client._experiment.optimization_config.objective.minimize
 
-    def create_experiment(self, name: str, objective:str,parameters:dict[str, list[float]],maximize: bool = True):
-        path = self._get_filepath(name)
-        if os.path.exists(path):
+    @classmethod
+    def best_observed(cls, client: Client) -> tuple:
+        """(best observed objective value, its trial index) over the study's data, or (None, None)."""
+        experiment = client._experiment
+        df = experiment.lookup_data().df
+        df = df[df["metric_name"] == experiment.optimization_config.objective.metric_names[0]]
+        if not len(df):
+            return None, None
+        best = df["mean"].idxmin() if cls.is_minimize(client) else df["mean"].idxmax()
+        return float(df["mean"][best]), int(df["trial_index"][best])
+
+    @staticmethod
+    def cost_report(client: Client, include_curve: bool = False) -> dict:
+        """
+        Evaluation cost spent (benchmarks.evaluation_cost of every completed or failed
+        trial, nothing for trials answered from the evaluation cache or failed without
+        being evaluated) against the best value found. best_full_fidelity is the best value actually
+        observed at full fidelity; best_true is the benchmark's exact value at the best
+        trial's parameters (free to compute for a benchmark, and the fair comparison
+        between single- and multi-fidelity studies).
+        """
+        experiment = client._experiment
+        objective = experiment.optimization_config.objective
+        name, minimize = objective.metric_names[0], objective.minimize
+        df = experiment.lookup_data().df
+        values = dict(zip(df[df["metric_name"] == name]["trial_index"], df[df["metric_name"] == name]["mean"]))
+        better = (lambda a, b: a < b) if minimize else (lambda a, b: a > b)
+        report = {"objective": name, "minimize": minimize, "trials": 0, "cached_trials": 0, "total_cost": 0.0,
+                  "best_full_fidelity": None, "best_full_fidelity_trial": None,
+                  "best_true": None, "best_true_trial": None, "cost_to_best_true": None}
+        curve = []
+        for index in sorted(experiment.trials):
+            trial = experiment.trials[index]
+            if trial.status not in (TrialStatus.COMPLETED, TrialStatus.FAILED) or trial.arm is None:
+                continue
+            params = trial.arm.parameters
+            report["trials"] += 1
+            report["cached_trials"] += eval_cache.is_hit(trial)
+            report["total_cost"] += eval_cache.trial_cost(name, trial)
+            value = values.get(index)
+            if value is None:
+                continue
+            fidelity = params.get(benchmarks.FIDELITY_PARAMETER, 1.0) if benchmarks.is_multi_fidelity(name) else 1.0
+            if fidelity >= 1.0 and (report["best_full_fidelity"] is None or better(value, report["best_full_fidelity"])):
+                report["best_full_fidelity"], report["best_full_fidelity_trial"] = float(value), index
+            if name in benchmarks.REGISTRY:
+                true = benchmarks.true_value(name, params)
+                if report["best_true"] is None or better(true, report["best_true"]):
+                    report["best_true"], report["best_true_trial"] = true, index
+                    report["cost_to_best_true"] = report["total_cost"]
+            if include_curve:
+                curve.append({"trial_index": index, "fidelity": fidelity,
+                              "cumulative_cost": round(report["total_cost"], 6), "value": float(value),
+                              "best_full_fidelity": report["best_full_fidelity"], "best_true": report["best_true"]})
+        report["total_cost"] = round(report["total_cost"], 6)
+        report["cost_unit_seconds"] = benchmarks.COST_UNIT_SECONDS
+        if include_curve:
+            report["curve"] = curve
+        return report
+
+    @staticmethod
+    def resolve_profile(profile: str = "default", generation_method: str = "default", **overrides) -> dict:
+        """A profile's settings with explicit (non-None) overrides applied, validated."""
+        if profile not in STRATEGY_PROFILES:
+            raise ValueError(f"Unknown profile '{profile}'. Use one of {list(STRATEGY_PROFILES)}.")
+        settings = {"warmup_trials": None, "batch_size": None, "time_budget_seconds": None,
+                    "generation_method": generation_method, **STRATEGY_PROFILES[profile]}
+        forced = STRATEGY_PROFILES[profile].get("generation_method")
+        if forced is not None and generation_method not in ("default", forced):
+            raise ValueError(f"Profile '{profile}' uses generation_method '{forced}', not '{generation_method}'.")
+        settings.update({k: v for k, v in overrides.items() if v is not None})
+        if settings["generation_method"] not in GENERATION_METHODS:
+            raise ValueError(f"Unknown generation_method '{settings['generation_method']}'. "
+                             f"Use one of {GENERATION_METHODS}.")
+        for key in ("warmup_trials", "batch_size"):
+            if settings[key] is not None and settings[key] < 1:
+                raise ValueError(f"{key} must be at least 1.")
+        if settings["time_budget_seconds"] is not None and settings["time_budget_seconds"] <= 0:
+            raise ValueError("time_budget_seconds must be positive.")
+        return {"name": profile, **settings}
+
+    @staticmethod
+    def profile(client: Client) -> dict:
+        """The strategy profile a study was created with (studies from before profiles: default)."""
+        return client._experiment._properties.get(PROFILE_PROPERTY) or {"name": "default"}
+
+    @staticmethod
+    def _multi_fidelity_strategy(sobol_trials: int = MULTI_FIDELITY_SOBOL_TRIALS) -> GenerationStrategy:
+        acqf = {"kg": qMultiFidelityKnowledgeGradient, "mes": qMultiFidelityMaxValueEntropy}[MULTI_FIDELITY_ACQF]
+        options = {"cost_intercept": benchmarks.FIDELITY_COST_INTERCEPT}
+        if MULTI_FIDELITY_ACQF == "kg":
+            options["num_fantasies"] = MULTI_FIDELITY_FANTASIES
+        return GenerationStrategy(nodes=[
+            # count every trial: those replayed from a trial log carry no generation-node name
+            GenerationStep(generator=Generators.SOBOL, num_trials=sobol_trials,
+                           use_all_trials_in_exp=True),
+            GenerationStep(generator=Generators.BOTORCH_MODULAR, num_trials=-1,
+                           generator_kwargs={"botorch_acqf_class": acqf, "acquisition_options": options}),
+        ])
+
+    def create_experiment(self, name: str, objective:str,parameters:dict[str, list[float]],maximize: bool = True,
+                          generation_method: str = "default", profile: str = "default", **profile_overrides):
+        with self.study_lock(name):
+            return self._create_experiment(name, objective, parameters, maximize, generation_method, profile,
+                                           **profile_overrides)
+
+    def _create_experiment(self, name: str, objective:str,parameters:dict[str, list[float]],maximize: bool = True,
+                           generation_method: str = "default", profile: str = "default", **profile_overrides):
+        if self.storage.exists(name) or (self.cache is not None and self.cache.contains(name)):
             raise ValueError(f"Experiment '{name}' already exists.")
-        
+        multi_fidelity = benchmarks.is_multi_fidelity(objective)
+        fidelity_bounds = parameters.get(benchmarks.FIDELITY_PARAMETER, [benchmarks.FIDELITY_MIN, 1.0])
+        if multi_fidelity:
+            parameters = {k: v for k, v in parameters.items() if k != benchmarks.FIDELITY_PARAMETER}
+        benchmarks.check_dimensions(objective, len(parameters))
+        settings = self.resolve_profile(profile, generation_method, **profile_overrides)
+        generation_method, warmup = settings["generation_method"], settings["warmup_trials"]
+
         client = Client()
         parameterlist = []
         param_names = parameters.keys()
@@ -37,6 +510,14 @@ class AxStateManager:
             name=name,
             parameters=parameterlist
         )
+        if multi_fidelity:
+            # The Client API has no fidelity parameters, so extend the core search space directly.
+            experiment = client._experiment
+            experiment.search_space = SearchSpace(parameters=[
+                *experiment.search_space.parameters.values(),
+                RangeParameter(name=benchmarks.FIDELITY_PARAMETER, parameter_type=ParameterType.FLOAT,
+                               lower=float(fidelity_bounds[0]), upper=1.0, is_fidelity=True, target_value=1.0),
+            ])
         if maximize:
             optval='+'
         else:
@@ -45,28 +526,262 @@ class AxStateManager:
         client.configure_optimization(
             objective=f'{optval}{objective}'
         )
+        if multi_fidelity and generation_method != "random_search":
+            client.set_generation_strategy(self._multi_fidelity_strategy(warmup or MULTI_FIDELITY_SOBOL_TRIALS))
+        elif warmup is not None and generation_method != "random_search":
+            # a warm-up size needs an explicit method; "default" maps to "fast", which is
+            # the method the Client itself uses when none is configured
+            client.configure_generation_strategy(
+                method="fast" if generation_method == "default" else generation_method,
+                initialization_budget=warmup)
+        elif generation_method != "default":
+            client.configure_generation_strategy(method=generation_method)
+        client._experiment._properties[PROFILE_PROPERTY] = settings
 
-        trials = client.get_next_trials(max_trials=1)
-        for trial_index, parameters in trials.items():
-            x = parameters["x"]
-            y = parameters["y"]
-            result = BENCHMARK_REGISTRY[objective]({"x":x,"y":y})
-            raw_data = {objective: result}
-            client.complete_trial(trial_index=trial_index, raw_data=raw_data)
-        best_parameters, prediction, index, name = client.get_best_parameterization()
-        client.save_to_json_file(path)
-        return f"Created experiment '{name}' at {path}, best {best_parameters}, pred {prediction}"
+        trials = self.get_next_trials(client, 1)
+        records = self.run_trials(client, objective, trials)
+        best_parameters, prediction, index, arm_name = self.get_best_parameterization(name, client)
+        with metrics.timer("save", name):
+            self.storage.save(name, client)
+        if self.cache is not None:
+            self.cache.put(name, client, dirty=False)
+        return {
+            "study": name,
+            "path": self.storage.path(name),
+            "first_trial": [{**r, "parameters": trials[r["trial_index"]]} for r in records],
+            "best_parameters": best_parameters,
+            "prediction": prediction,
+            "profile": settings,
+        }
+
+    @classmethod
+    def get_next_trials(cls, client: Client, n: int, batches: list = None) -> dict:
+        """
+        Up to n new trials, generated as the study's strategy profile says: in batches of
+        at most batch_size (BUDGETED_BATCH_SIZE when only a time budget is set), switching
+        to quasi-random candidates once time_budget_seconds is spent. The deadline is
+        checked before each batch, so the batch running when it passes can overrun it.
+        A short batch (Ax returns one at the Sobol-to-model transition) is followed by
+        another; generation only stops early when the strategy returns nothing or refuses
+        a later batch (e.g. the Sobol warm-up is used up but its trials are still running),
+        and the trials generated so far are returned rather than left orphaned. If `batches`
+        is given, one {trials, seconds, source} record per batch is appended to it; on an
+        early stop the last record also has "stopped", the reason.
+        """
+        profile = cls.profile(client)
+        budget = profile.get("time_budget_seconds")
+        batch_size = profile.get("batch_size") or (BUDGETED_BATCH_SIZE if budget is not None else n)
+        trials = {}
+        start = time.perf_counter()
+        while len(trials) < n:
+            want = min(batch_size, n - len(trials))
+            batch_start = time.perf_counter()
+            if budget is not None and batch_start - start > budget:
+                new, source = cls._quasi_random_trials(client, n - len(trials)), "fallback"
+                metrics.incr("generation_fallback", n=len(new))
+            else:
+                try:
+                    # this is where Ax fits its model
+                    with metrics.timer("generate"):
+                        new = client.get_next_trials(max_trials=want)
+                except Exception as e:
+                    if not trials:
+                        raise
+                    print(f"[ax_manager] generation stopped after {len(trials)} trials: {e}", file=sys.stderr)
+                    if batches is not None:
+                        batches.append({"trials": 0, "seconds": time.perf_counter() - batch_start, "source": None,
+                                        "stopped": str(e)})
+                    break
+                source = cls._generation_node(client, new)
+            trials.update(new)
+            if batches is not None:
+                batches.append({"trials": len(new), "seconds": time.perf_counter() - batch_start, "source": source})
+            if not new:
+                if batches is not None:
+                    batches[-1]["stopped"] = "the strategy returned no trials"
+                break
+        return trials
+
+    @staticmethod
+    def _quasi_random_trials(client: Client, n: int) -> dict:
+        """n scrambled-Sobol candidates attached as trials, without fitting any model."""
+        experiment = client._experiment
+        with metrics.timer("generate_fallback"):
+            run = Generators.SOBOL(experiment=experiment, seed=len(experiment.trials)).gen(n=n)
+            return {client.attach_trial(parameters=dict(arm.parameters)): dict(arm.parameters) for arm in run.arms}
+
+    @staticmethod
+    def _generation_node(client: Client, trials: dict) -> str | None:
+        """Name of the generation node (e.g. "Sobol", "MBM") that produced these trials."""
+        if not trials:
+            return None
+        runs = client._experiment.trials[min(trials)].generator_runs
+        return getattr(runs[0], "_generation_node_name", None) if runs else None
+
+    def run_trials(self, client: Client, objective: str, trials: dict, max_workers: int = EVAL_MAX_WORKERS,
+                   executor: str = EVAL_EXECUTOR, timeout: float = EVAL_BATCH_TIMEOUT_SECONDS) -> list[dict]:
+        """
+        Evaluate `objective` for a batch from client.get_next_trials and complete each
+        trial in the client as its result arrives. Points already in the evaluation cache
+        are completed from it (seconds None, cached True, cost 0) and only the rest are
+        evaluated.
+        Trials whose evaluation raises are marked failed. After `timeout` seconds, trials
+        whose evaluation hasn't started are cancelled and marked failed (cost 0); those still being
+        evaluated stay RUNNING and are completed in the background once they finish
+        (their records have running True).
+        Returns one record per trial: trial_index, value (None if failed), seconds, cost, error, cached.
+        """
+        if objective not in BENCHMARK_REGISTRY:
+            raise ValueError(f"Function {objective} not found.")
+        name = client._experiment.name
+        records = []
+        costs = {i: benchmarks.evaluation_cost(objective, p) for i, p in trials.items()}
+        evaluated = []  # (parameters, value, seconds) to add to the evaluation cache
+
+        def finish(trial_index, value=None, seconds=None, error=None, cached=False, started=True):
+            if seconds is not None:
+                metrics.observe("evaluate", seconds)
+                evaluated.append((trials[trial_index], value, seconds))
+            with metrics.timer("complete"):
+                if cached:
+                    client._experiment.trials[trial_index].update_run_metadata({eval_cache.HIT_METADATA_KEY: True})
+                if not started:
+                    client._experiment.trials[trial_index].update_run_metadata(
+                        {eval_cache.NOT_EVALUATED_METADATA_KEY: True})
+                if error is None:
+                    client.complete_trial(trial_index=trial_index, raw_data={objective: value})
+                else:
+                    client.mark_trial_failed(trial_index=trial_index)
+                    metrics.incr("trial_failed")
+            records.append({"trial_index": trial_index, "value": value, "seconds": seconds,
+                            "cost": costs[trial_index] if started and not cached else 0.0, "error": error,
+                            "cached": cached})
+
+        def late(trial_index, future):
+            metrics.incr("trial_late")
+            records.append({"trial_index": trial_index, "value": None, "seconds": None,
+                            "cost": costs[trial_index], "error": None, "cached": False, "running": True})
+            future.add_done_callback(
+                lambda f: self._complete_late(name, objective, trial_index, trials[trial_index], f))
+
+        if self.eval_cache is not None:
+            hits = self.eval_cache.get_many(objective, trials)
+            for trial_index, value in hits.items():
+                finish(trial_index, value, cached=True)
+            trials_to_run = {i: p for i, p in trials.items() if i not in hits}
+        else:
+            trials_to_run = trials
+        try:
+            self._evaluate_trials(objective, trials_to_run, finish, late, max_workers, executor, timeout)
+        finally:
+            if self.eval_cache is not None:
+                self.eval_cache.put_many(objective, evaluated)
+        return records
+
+    def _complete_late(self, name: str, objective: str, trial_index: int, parameters: dict, future):
+        """Complete (or fail) a trial whose evaluation overran its batch, once it finishes."""
+        try:
+            value, seconds = future.result()
+            error = None
+        except Exception as e:
+            value, seconds, error = None, None, str(e)
+        try:
+            with metrics.tool_call("late_trial", name), self.study_lock(name):
+                # the live Client: the one the batch ran on may have been evicted since
+                client = self.load_client(name)
+                if client._experiment.trials[trial_index].status != TrialStatus.RUNNING:
+                    return
+                if error is None:
+                    metrics.observe("evaluate", seconds)
+                    client.complete_trial(trial_index=trial_index, raw_data={objective: value})
+                else:
+                    client.mark_trial_failed(trial_index=trial_index)
+                    metrics.incr("trial_failed")
+                self.save_client(name, client)
+            if error is None and self.eval_cache is not None:
+                self.eval_cache.put_many(objective, [(parameters, value, seconds)])
+        except Exception as e:
+            print(f"[ax_manager] could not complete late trial {trial_index} of '{name}': {e}", file=sys.stderr)
+
+    @staticmethod
+    def _evaluate_trials(objective: str, trials: dict, finish, late, max_workers: int, executor: str,
+                         timeout: float):
+        """
+        Evaluate the trials serially or on a pool, calling finish() with each result, or
+        late(trial_index, future) for evaluations still running after `timeout`.
+        """
+        if not trials:
+            return
+        max_workers = min(max_workers, EVAL_MAX_WORKERS_LIMIT, len(trials))
+        if executor == "process":
+            max_workers = min(max_workers, os.cpu_count() or 1)
+        if max_workers <= 1:
+            for trial_index, parameters in trials.items():
+                try:
+                    value, seconds = benchmarks.timed_evaluate(objective, dict(parameters))
+                    finish(trial_index, value, seconds)
+                except Exception as e:
+                    finish(trial_index, error=str(e))
+            return
+
+        if executor == "process":
+            pool = concurrent.futures.ProcessPoolExecutor(max_workers=max_workers)
+        elif executor == "thread":
+            pool = concurrent.futures.ThreadPoolExecutor(max_workers=max_workers)
+        else:
+            raise ValueError(f"Unknown executor '{executor}'. Use 'thread' or 'process'.")
+        try:
+            futures = {
+                pool.submit(benchmarks.timed_evaluate, objective, dict(p)): trial_index
+                for trial_index, p in trials.items()
+            }
+            pending = set(futures)
+
+            def collect(future):
+                try:
+                    value, seconds = future.result()
+                    finish(futures[future], value, seconds)
+                except Exception as e:
+                    finish(futures[future], error=str(e))
+
+            try:
+                for future in concurrent.futures.as_completed(futures, timeout=timeout):
+                    pending.discard(future)
+                    collect(future)
+            except concurrent.futures.TimeoutError:
+                for future in pending:
+                    if future.cancel():
+                        finish(futures[future], error=f"not started within {timeout}s", started=False)
+                    elif future.done():
+                        collect(future)
+                    else:
+                        late(futures[future], future)
+        finally:
+            # don't block on evaluations that overran the timeout
+            pool.shutdown(wait=False, cancel_futures=True)
 
     def load_client(self, name: str) -> Client:
-        path = self._get_filepath(name)
-        if not os.path.exists(path):
-            raise ValueError(f"Experiment '{name}' not found.")
-        client = Client.load_from_json_file(path) 
-        return client
+        name = clean_name(name)
+        if self.cache is not None:
+            return self.cache.get(name)
+        with metrics.timer("load", name):
+            return self.storage.load(name)
 
-    def save_client(self, name: str, client: Client):
-        path = self._get_filepath(name)
-        client.save_to_json_file(path)
+    def save_client(self, name: str, client: Client, flush: bool = False):
+        """
+        Save `name`. With the Client cache this is write-behind unless `flush` is set, which
+        writes it out now (for changes that must survive a crash, e.g. before queue results
+        are marked reconciled). The caller holds study_lock(name).
+        """
+        name = clean_name(name)
+        if self.cache is not None:
+            # write-behind: the flusher thread (or eviction/shutdown) persists it
+            self.cache.put(name, client, dirty=True)
+            if flush:
+                self.cache.flush(name)
+            return
+        with metrics.timer("save", name):
+            self.storage.save(name, client)
     
     # def add_parameter_to_client(self, name:str, client: Client, param_name: str, bounds: list, param_type: str = "range"):
     #     path = self._get_filepath(name)
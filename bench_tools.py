@@ -0,0 +1,280 @@
+"""
+Latency/throughput benchmark for the MCP tools (no LLM involved).
+
+Drives server.py over a local stdio MCP session in a scratch directory:
+for every (function, size) it creates a study, grows it to `size` trials with
+get_and_complete_next_trial, then times repeated single-trial calls and
+provide_best_parameters at that size. Afterwards it times the Ax phases
+(load, save, generation/fit) in-process on the resulting study files, and
+includes the server's own per-phase breakdown from get_server_metrics.
+
+    python bench_tools.py --sizes 10 50 100 500 --functions ackley sphere --output bench.json
+    python bench_tools.py --sizes 20 --functions levy --dims 2 5 10 20 --generation-method fast
+    python bench_tools.py --sizes 100 --functions hartmann6 --profile throughput
+
+--url benchmarks an already running shared server (python server.py --transport
+streamable-http) instead of spawning one; the in-process phase timings are skipped
+since the studies live in that server's directory.
+
+With --startup it instead compares server start-up under each AX_MCP_IMPORT mode
+(eager / lazy / background): time to list_tools, to a first Ax-free tool call,
+and to a first create_study.
+
+    python bench_tools.py --startup --repeats 3
+"""
+import os
+import sys
+import json
+import time
+import asyncio
+import argparse
+import platform
+import tempfile
+import resource
+import tracemalloc
+import statistics
+
+from mcp import ClientSession, StdioServerParameters
+from mcp.client.stdio import stdio_client
+
+from mcp_connection import connect
+
+import benchmarks
+
+SERVER_SCRIPT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "server.py")
+DEFAULT_SIZES = [10, 50, 100]
+DEFAULT_FUNCTIONS = ["ackley", "sphere"]
+BOUNDS = {"x": [-3.0, 3.0], "y": [-3.0, 3.0]}
+DEFAULT_DIMS = [2]
+
+
+def study_bounds(function: str, dims: int) -> dict:
+    """BOUNDS for the 2-D functions; x1..xd over the recommended range for the N-dimensional ones."""
+    if benchmarks.DIMENSIONS[function] == 2:
+        return BOUNDS
+    dims = benchmarks.DIMENSIONS[function] or dims
+    lo, hi = benchmarks.BOUNDS[function]
+    return {f"x{i + 1}": [lo, hi] for i in range(dims)}
+
+
+def summarize(samples: list[float]) -> dict:
+    """p50/p95/mean/max in milliseconds."""
+    if not samples:
+        return {}
+    ms = sorted(s * 1000 for s in samples)
+    def pct(p):
+        return ms[min(len(ms) - 1, round(p / 100 * (len(ms) - 1)))]
+    return {"n": len(ms), "p50_ms": pct(50), "p95_ms": pct(95),
+            "mean_ms": statistics.fmean(ms), "max_ms": ms[-1]}
+
+
+async def timed_call(session, tool: str, args: dict):
+    start = time.perf_counter()
+    result = await session.call_tool(tool, arguments=args)
+    elapsed = time.perf_counter() - start
+    text = result.content[0].text if result.content else ""
+    if result.isError or text.startswith(("Error", '{"error"')):
+        raise RuntimeError(f"{tool} failed: {text}")
+    return elapsed, text
+
+
+async def bench_study(session, function: str, size: int, batch: int, repeats: int,
+                      bounds: dict = BOUNDS, generation_method: str = "default", suffix: str = "",
+                      profile: str = "default") -> dict:
+    study = f"bench_{function}_{len(bounds)}d_{size}" if len(bounds) != 2 else f"bench_{function}_{size}"
+    study += suffix
+    create_s, _ = await timed_call(session, "create_study", {
+        "study_name": study, "objective_name": function, "parameters": bounds, "maximize": False,
+        "generation_method": generation_method, "profile": profile,
+    })
+    grow = []
+    trials = 1  # create_study runs the first trial
+    while trials < size:
+        n = min(batch, size - trials)
+        elapsed, _ = await timed_call(session, "get_and_complete_next_trial", {
+            "study_name": study, "objective_name": function, "number_loops": n,
+        })
+        grow.append(elapsed / n)
+        trials += n
+    step, best = [], []
+    for _ in range(repeats):
+        elapsed, _ = await timed_call(session, "get_and_complete_next_trial", {
+            "study_name": study, "objective_name": function, "number_loops": 1,
+        })
+        step.append(elapsed)
+        elapsed, _ = await timed_call(session, "provide_best_parameters", {"study_name": study})
+        best.append(elapsed)
+    _, text = await timed_call(session, "get_cost_report", {"study_name": study})
+    return {
+        "study": study,
+        "function": function,
+        "dims": len(bounds),
+        "trials": trials + repeats,
+        "create_study": summarize([create_s]),
+        "grow_per_trial": summarize(grow),
+        "get_and_complete_next_trial": summarize(step),
+        "provide_best_parameters": summarize(best),
+        "cost": json.loads(text),
+    }
+
+
+def bench_phases(workdir: str, study: str, repeats: int) -> dict:
+    """Time load/save/generation in-process against the study written by the server."""
+    cwd = os.getcwd()
+    os.chdir(workdir)
+    try:
+        from ax_manager import AxStateManager
+        manager = AxStateManager(cache=False, file_locks=False)
+        load, save, gen = [], [], []
+        tracemalloc.start()
+        for _ in range(repeats):
+            start = time.perf_counter()
+            client = manager.load_client(study)
+            load.append(time.perf_counter() - start)
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        for _ in range(repeats):
+            start = time.perf_counter()
+            client.save_to_json_file("bench_snapshot.json")
+            save.append(time.perf_counter() - start)
+        for _ in range(repeats):
+            # generation includes the model fit; done on a throwaway copy
+            client = manager.load_client(study)
+            start = time.perf_counter()
+            client.get_next_trials(max_trials=1)
+            gen.append(time.perf_counter() - start)
+        return {
+            "study_bytes": manager.storage.size(study),
+            "load": summarize(load),
+            "save_full_snapshot": summarize(save),
+            "generate_and_fit": summarize(gen),
+            "load_peak_alloc_bytes": peak,
+        }
+    finally:
+        os.chdir(cwd)
+
+
+async def run(args) -> dict:
+    workdir = None if args.url else args.workdir or tempfile.mkdtemp(prefix="ax_bench_")
+    suffix = time.strftime("_%H%M%S") if args.url else ""  # a shared server may already have these studies
+    results = []
+    start = time.perf_counter()
+    async with connect(sys.executable, [SERVER_SCRIPT], url=args.url, cwd=workdir) as session:
+        startup_s = time.perf_counter() - start
+        studies = {(function, len(bounds)): bounds for function in args.functions
+                   for bounds in (study_bounds(function, d) for d in args.dims)}
+        for (function, dims), bounds in studies.items():
+            for size in args.sizes:
+                print(f"⏱️  {function} ({dims}-d) @ {size} trials...", file=sys.stderr)
+                results.append(await bench_study(session, function, size, args.batch, args.repeats,
+                                                 bounds, args.generation_method, suffix, args.profile))
+        # server-side phase breakdown (load / generate / evaluate / save ...)
+        _, text = await timed_call(session, "get_server_metrics", {})
+        server_metrics = json.loads(text)
+    if workdir is not None:
+        for r in results:
+            r["phases"] = bench_phases(workdir, r["study"], args.repeats)
+    return {
+        "meta": {
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "workdir": workdir,
+            "url": args.url,
+            "batch": args.batch,
+            "repeats": args.repeats,
+            "generation_method": args.generation_method,
+            "profile": args.profile,
+            "harness_max_rss_kb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+            "server_max_rss_kb": resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss,
+        },
+        "server_startup_s": startup_s,
+        "server_metrics": server_metrics,
+        "results": results,
+    }
+
+
+IMPORT_MODES = ["eager", "lazy", "background"]
+
+
+async def startup_once(mode: str, workdir: str) -> dict:
+    params = StdioServerParameters(command=sys.executable, args=[SERVER_SCRIPT], cwd=workdir,
+                                   env={**os.environ, "AX_MCP_IMPORT": mode})
+    start = time.perf_counter()
+    async with stdio_client(params) as (read, write):
+        async with ClientSession(read, write) as session:
+            await session.initialize()
+            await session.list_tools()
+            list_tools = time.perf_counter() - start
+            await timed_call(session, "list_available_functions", {})
+            first_light = time.perf_counter() - start
+            await timed_call(session, "create_study", {
+                "study_name": f"startup_{mode}", "objective_name": "sphere", "parameters": BOUNDS,
+                "maximize": False,
+            })
+            first_ax = time.perf_counter() - start
+    return {"list_tools": list_tools, "first_light_call": first_light, "first_create_study": first_ax}
+
+
+async def run_startup(args) -> dict:
+    workdir = args.workdir or tempfile.mkdtemp(prefix="ax_bench_")
+    results = {}
+    for mode in IMPORT_MODES:
+        samples = []
+        for i in range(args.repeats):
+            print(f"⏱️  startup ({mode}) {i + 1}/{args.repeats}...", file=sys.stderr)
+            run_dir = os.path.join(workdir, f"{mode}_{i}")
+            os.makedirs(run_dir, exist_ok=True)
+            samples.append(await startup_once(mode, run_dir))
+        results[mode] = {k: summarize([s[k] for s in samples]) for k in samples[0]}
+    return {"meta": {"timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"), "python": platform.python_version(),
+                     "workdir": workdir, "repeats": args.repeats},
+            "startup": results}
+
+
+def print_startup_table(report: dict):
+    print(f"{'mode':<12}{'list_tools p50':>16}{'first call p50':>16}{'create_study p50':>18}", file=sys.stderr)
+    for mode, r in report["startup"].items():
+        print(f"{mode:<12}{r['list_tools']['p50_ms']:>16.0f}{r['first_light_call']['p50_ms']:>16.0f}"
+              f"{r['first_create_study']['p50_ms']:>18.0f}", file=sys.stderr)
+
+
+def print_table(report: dict):
+    print(f"{'study':<24}{'trials':>7}{'KB':>8}{'step p50':>10}{'p95':>9}{'best p50':>10}{'p95':>9}"
+          f"{'load p50':>10}{'gen p50':>10}", file=sys.stderr)
+    for r in report["results"]:
+        step, best, ph = r["get_and_complete_next_trial"], r["provide_best_parameters"], r.get("phases")
+        phases = (f"{ph['study_bytes'] / 1024:>8.0f}", f"{ph['load']['p50_ms']:>10.1f}{ph['generate_and_fit']['p50_ms']:>10.1f}") \
+            if ph else (f"{'-':>8}", f"{'-':>10}{'-':>10}")
+        print(f"{r['study']:<24}{r['trials']:>7}{phases[0]}"
+              f"{step['p50_ms']:>10.1f}{step['p95_ms']:>9.1f}{best['p50_ms']:>10.1f}{best['p95_ms']:>9.1f}"
+              f"{phases[1]}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES, help="trial counts (10-500)")
+    parser.add_argument("--functions", nargs="+", default=DEFAULT_FUNCTIONS)
+    parser.add_argument("--dims", type=int, nargs="+", default=DEFAULT_DIMS,
+                        help="dimensions for the N-dimensional functions (2-D ones ignore this)")
+    parser.add_argument("--generation-method", default="default", help="create_study generation_method")
+    parser.add_argument("--profile", default="default", help="create_study strategy profile")
+    parser.add_argument("--batch", type=int, default=10, help="trials per call while growing a study")
+    parser.add_argument("--repeats", type=int, default=5, help="timed calls per tool at each size")
+    parser.add_argument("--workdir", help="where studies are written (default: a new temp dir)")
+    parser.add_argument("--output", help="write the JSON report here (default: stdout)")
+    parser.add_argument("--url", help="benchmark a running shared server (e.g. http://127.0.0.1:8000/mcp)")
+    parser.add_argument("--startup", action="store_true", help="compare server start-up across Ax import modes")
+    args = parser.parse_args()
+
+    if args.startup:
+        report = asyncio.run(run_startup(args))
+        print_startup_table(report)
+    else:
+        report = asyncio.run(run(args))
+        print_table(report)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+    else:
+        print(json.dumps(report, indent=2))
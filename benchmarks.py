@@ -1,4 +1,24 @@
+import re
 import math
+import time
+import numpy as np
+
+def _natural_key(name: str):
+    return [int(t) if t.isdigit() else t for t in re.split(r"(\d+)", name)]
+
+def parameter_names(d: dict[str, float]) -> list[str]:
+    """Parameter names in evaluation order: natural sort, so x1, x2, ..., x10 and x, y both work."""
+    return sorted(d, key=_natural_key)
+
+def _xy(d: dict[str, float]) -> tuple[float, float]:
+    """x and y for the 2-D functions; studies with other parameter names use their first two."""
+    if 'x' in d or 'y' in d or len(d) < 2:
+        return d.get('x', 0), d.get('y', 0)
+    names = parameter_names(d)
+    return d[names[0]], d[names[1]]
+
+def _vector(d: dict[str, float]) -> np.ndarray:
+    return np.array([[d[k] for k in parameter_names(d)]], dtype=float)
 
 def ackley(d: dict[str, float]) -> float:
     """
@@ -6,7 +26,7 @@ def ackley(d: dict[str, float]) -> float:
     Global minimum is 0 at (0, 0).
     Recommended bounds: [-32.768, 32.768]
     """
-    x, y = d.get('x', 0), d.get('y', 0)
+    x, y = _xy(d)
     term1 = -20 * math.exp(-0.2 * math.sqrt(0.5 * (x**2 + y**2)))
     term2 = -math.exp(0.5 * (math.cos(2 * math.pi * x) + math.cos(2 * math.pi * y)))
     return term1 + term2 + math.e + 20
@@ -17,7 +37,7 @@ def rosenbrock(d: dict[str, float]) -> float:
     Global minimum is 0 at (1, 1). Hard to converge.
     Recommended bounds: [-5, 10]
     """
-    x, y = d.get('x', 0), d.get('y', 0)
+    x, y = _xy(d)
     a, b = 1, 100
     return (a - x)**2 + b * (y - x**2)**2
 
@@ -27,7 +47,7 @@ def rastrigin(d: dict[str, float]) -> float:
     Global minimum is 0 at (0, 0).
     Recommended bounds: [-5.12, 5.12]
     """
-    x, y = d.get('x', 0), d.get('y', 0)
+    x, y = _xy(d)
     A = 10
     return A * 2 + (x**2 - A * math.cos(2 * math.pi * x)) + (y**2 - A * math.cos(2 * math.pi * y))
 
@@ -37,7 +57,7 @@ def sphere(d: dict[str, float]) -> float:
     Global minimum is 0 at (0, 0).
     Recommended bounds: [-10, 10]
     """
-    x, y = d.get('x', 0), d.get('y', 0)
+    x, y = _xy(d)
     return x**2 + y**2
 
 def beale(d: dict[str, float]) -> float:
@@ -46,24 +66,343 @@ def beale(d: dict[str, float]) -> float:
     Global minimum is 0 at (3, 0.5).
     Recommended bounds: [-4.5, 4.5]
     """
-    x, y = d.get('x', 0), d.get('y', 0)
+    x, y = _xy(d)
     return (1.5 - x + x*y)**2 + (2.25 - x + x*y**2)**2 + (2.625 - x + x*y**3)**2
 
+# N-dimensional families. They take any number of parameters (named e.g. x1..xd,
+# ordered by parameter_names) except hartmann6, which needs exactly six.
+
+def ackley_nd(d: dict[str, float]) -> float:
+    """
+    Ackley function in d dimensions. Many local minima.
+    Global minimum is 0 at the origin.
+    Recommended bounds: [-32.768, 32.768] per dimension
+    """
+    return float(ackley_nd_batch(_vector(d))[0])
+
+def rastrigin_nd(d: dict[str, float]) -> float:
+    """
+    Rastrigin function in d dimensions. Highly multimodal.
+    Global minimum is 0 at the origin.
+    Recommended bounds: [-5.12, 5.12] per dimension
+    """
+    return float(rastrigin_nd_batch(_vector(d))[0])
+
+def levy(d: dict[str, float]) -> float:
+    """
+    Levy function in d dimensions. Many local minima along ridges.
+    Global minimum is 0 at (1, ..., 1).
+    Recommended bounds: [-10, 10] per dimension
+    """
+    return float(levy_batch(_vector(d))[0])
+
+def styblinski_tang(d: dict[str, float]) -> float:
+    """
+    Styblinski-Tang function in d dimensions. One global and many local minima.
+    Global minimum is -39.16599 * d at (-2.903534, ..., -2.903534).
+    Recommended bounds: [-5, 5] per dimension
+    """
+    return float(styblinski_tang_batch(_vector(d))[0])
+
+def hartmann6(d: dict[str, float]) -> float:
+    """
+    Hartmann function in 6 dimensions. Six local minima.
+    Global minimum is -3.32237 at (0.20169, 0.150011, 0.476874, 0.275332, 0.311652, 0.6573).
+    Recommended bounds: [0, 1] per dimension
+    """
+    return float(hartmann6_batch(_vector(d))[0])
+
 # Registry of available functions
 REGISTRY = {
     "ackley": ackley,
     "rosenbrock": rosenbrock,
     "rastrigin": rastrigin,
     "sphere": sphere,
-    "beale": beale
+    "beale": beale,
+    "ackley_nd": ackley_nd,
+    "rastrigin_nd": rastrigin_nd,
+    "levy": levy,
+    "styblinski_tang": styblinski_tang,
+    "hartmann6": hartmann6
+}
+
+# Number of parameters each function expects (None = any).
+DIMENSIONS = {
+    "ackley": 2,
+    "rosenbrock": 2,
+    "rastrigin": 2,
+    "sphere": 2,
+    "beale": 2,
+    "ackley_nd": None,
+    "rastrigin_nd": None,
+    "levy": None,
+    "styblinski_tang": None,
+    "hartmann6": 6
+}
+
+# Recommended per-dimension bounds (same as the docstrings).
+BOUNDS = {
+    "ackley": (-32.768, 32.768),
+    "rosenbrock": (-5.0, 10.0),
+    "rastrigin": (-5.12, 5.12),
+    "sphere": (-10.0, 10.0),
+    "beale": (-4.5, 4.5),
+    "ackley_nd": (-32.768, 32.768),
+    "rastrigin_nd": (-5.12, 5.12),
+    "levy": (-10.0, 10.0),
+    "styblinski_tang": (-5.0, 5.0),
+    "hartmann6": (0.0, 1.0)
+}
+
+# Multi-fidelity variants. "<name>_mf" takes the base function's parameters plus
+# FIDELITY_PARAMETER in [FIDELITY_MIN, 1]. Below full fidelity the value carries a
+# smooth, deterministic error that vanishes at 1, and an evaluation costs
+#     FIDELITY_COST_INTERCEPT + fidelity    cost units
+# (the affine cost model Ax's multi-fidelity acquisition assumes); every other
+# function costs a full-fidelity evaluation. With COST_UNIT_SECONDS > 0 evaluations
+# also sleep that long per unit, to simulate an expensive objective.
+MULTI_FIDELITY_SUFFIX = "_mf"
+FIDELITY_PARAMETER = "fidelity"
+FIDELITY_MIN = 0.1
+FIDELITY_BIAS = 0.2   # size of the low-fidelity error relative to |f| + 1
+FIDELITY_COST_INTERCEPT = 0.1
+COST_UNIT_SECONDS = 0.0
+
+def is_multi_fidelity(name: str) -> bool:
+    return name.endswith(MULTI_FIDELITY_SUFFIX) and name in REGISTRY
+
+def base_function(name: str) -> str:
+    return name[:-len(MULTI_FIDELITY_SUFFIX)] if is_multi_fidelity(name) else name
+
+def evaluation_cost(name: str, params: dict) -> float:
+    """Cost units charged for evaluating `name` at `params`."""
+    fidelity = params.get(FIDELITY_PARAMETER, 1.0) if is_multi_fidelity(name) else 1.0
+    return FIDELITY_COST_INTERCEPT + fidelity
+
+def true_value(name: str, params: dict) -> float:
+    """The full-fidelity value at `params`, without any simulated delay (for reporting)."""
+    params = {k: v for k, v in params.items() if k != FIDELITY_PARAMETER or not is_multi_fidelity(name)}
+    return REGISTRY[base_function(name)](params)
+
+def _multi_fidelity(name: str):
+    base = REGISTRY[name]
+
+    def fn(d: dict[str, float]) -> float:
+        d = dict(d)
+        fidelity = d.pop(FIDELITY_PARAMETER, 1.0)
+        if COST_UNIT_SECONDS:
+            time.sleep(COST_UNIT_SECONDS * (FIDELITY_COST_INTERCEPT + fidelity))
+        value = base(d)
+        return value + (1 - fidelity) * FIDELITY_BIAS * (abs(value) + 1) * math.sin(sum(d.values()))
+
+    fn.__name__ = name + MULTI_FIDELITY_SUFFIX
+    details = base.__doc__.strip().split("\n", 1)[1]  # minimum, bounds
+    fn.__doc__ = f"""
+    Multi-fidelity {name}: same parameters plus '{FIDELITY_PARAMETER}' in [{FIDELITY_MIN}, 1] (1 = exact).
+    Costs {FIDELITY_COST_INTERCEPT} + fidelity units per evaluation.
+{details}
+    """
+    return fn
+
+for _name in list(REGISTRY):
+    REGISTRY[_name + MULTI_FIDELITY_SUFFIX] = _multi_fidelity(_name)
+    DIMENSIONS[_name + MULTI_FIDELITY_SUFFIX] = DIMENSIONS[_name]
+    BOUNDS[_name + MULTI_FIDELITY_SUFFIX] = BOUNDS[_name]
+
+# Evaluations are memoized on disk (eval_cache.py) under the function's version: bump a
+# function's entry whenever its definition changes so old results are not reused.
+# Functions in STOCHASTIC (noisy objectives) are never cached.
+VERSIONS: dict[str, int] = {}
+STOCHASTIC: set[str] = set()
+
+def version(name: str) -> str:
+    """Cache version of `name`; multi-fidelity variants also depend on FIDELITY_BIAS."""
+    v = str(VERSIONS.get(base_function(name), 1))
+    return f"{v}/bias={FIDELITY_BIAS}" if is_multi_fidelity(name) else v
+
+def is_deterministic(name: str) -> bool:
+    return base_function(name) not in STOCHASTIC and name not in STOCHASTIC
+
+def check_dimensions(name: str, n: int):
+    """Raise ValueError if `name` cannot take n parameters (not counting the fidelity)."""
+    if name not in REGISTRY:
+        raise ValueError(f"Function {name} not found.")
+    dim = DIMENSIONS[name]
+    if dim is not None and n != dim:
+        raise ValueError(f"Function {name} takes {dim} parameters, got {n}.")
+    if dim is None and n < 1:
+        raise ValueError(f"Function {name} takes at least 1 parameter, got {n}.")
+
+def check_parameters(name: str, params: dict):
+    """
+    Raise ValueError if `name` cannot be evaluated at the parameter dict `params`.
+    The 2-D functions also take just x or y (the other defaults to 0), like they always have.
+    """
+    names = [k for k in params if k != FIDELITY_PARAMETER or not is_multi_fidelity(name)]
+    if DIMENSIONS.get(name) == 2 and set(names) <= {"x", "y"}:
+        return
+    check_dimensions(name, len(names))
+
+# Vectorized versions. Each takes an (n, 2) array whose columns are x and y
+# and returns an (n,) array, matching the scalar functions above point-for-point.
+
+def ackley_batch(X: np.ndarray) -> np.ndarray:
+    x, y = X[:, 0], X[:, 1]
+    term1 = -20 * np.exp(-0.2 * np.sqrt(0.5 * (x**2 + y**2)))
+    term2 = -np.exp(0.5 * (np.cos(2 * np.pi * x) + np.cos(2 * np.pi * y)))
+    return term1 + term2 + np.e + 20
+
+def rosenbrock_batch(X: np.ndarray) -> np.ndarray:
+    x, y = X[:, 0], X[:, 1]
+    a, b = 1, 100
+    return (a - x)**2 + b * (y - x**2)**2
+
+def rastrigin_batch(X: np.ndarray) -> np.ndarray:
+    x, y = X[:, 0], X[:, 1]
+    A = 10
+    return A * 2 + (x**2 - A * np.cos(2 * np.pi * x)) + (y**2 - A * np.cos(2 * np.pi * y))
+
+def sphere_batch(X: np.ndarray) -> np.ndarray:
+    x, y = X[:, 0], X[:, 1]
+    return x**2 + y**2
+
+def beale_batch(X: np.ndarray) -> np.ndarray:
+    x, y = X[:, 0], X[:, 1]
+    return (1.5 - x + x*y)**2 + (2.25 - x + x*y**2)**2 + (2.625 - x + x*y**3)**2
+
+# (n, d) versions of the N-dimensional families.
+
+def ackley_nd_batch(X: np.ndarray) -> np.ndarray:
+    term1 = -20 * np.exp(-0.2 * np.sqrt(np.mean(X**2, axis=1)))
+    term2 = -np.exp(np.mean(np.cos(2 * np.pi * X), axis=1))
+    return term1 + term2 + np.e + 20
+
+def rastrigin_nd_batch(X: np.ndarray) -> np.ndarray:
+    A = 10
+    return A * X.shape[1] + np.sum(X**2 - A * np.cos(2 * np.pi * X), axis=1)
+
+def levy_batch(X: np.ndarray) -> np.ndarray:
+    W = 1 + (X - 1) / 4
+    w1, wd, wi = W[:, 0], W[:, -1], W[:, :-1]
+    return (np.sin(np.pi * w1)**2
+            + np.sum((wi - 1)**2 * (1 + 10 * np.sin(np.pi * wi + 1)**2), axis=1)
+            + (wd - 1)**2 * (1 + np.sin(2 * np.pi * wd)**2))
+
+def styblinski_tang_batch(X: np.ndarray) -> np.ndarray:
+    return 0.5 * np.sum(X**4 - 16 * X**2 + 5 * X, axis=1)
+
+_HARTMANN6_ALPHA = np.array([1.0, 1.2, 3.0, 3.2])
+_HARTMANN6_A = np.array([
+    [10, 3, 17, 3.5, 1.7, 8],
+    [0.05, 10, 17, 0.1, 8, 14],
+    [3, 3.5, 1.7, 10, 17, 8],
+    [17, 8, 0.05, 10, 0.1, 14],
+])
+_HARTMANN6_P = 1e-4 * np.array([
+    [1312, 1696, 5569, 124, 8283, 5886],
+    [2329, 4135, 8307, 3736, 1004, 9991],
+    [2348, 1451, 3522, 2883, 3047, 6650],
+    [4047, 8828, 8732, 5743, 1091, 381],
+])
+
+def hartmann6_batch(X: np.ndarray) -> np.ndarray:
+    inner = np.sum(_HARTMANN6_A * (X[:, None, :] - _HARTMANN6_P)**2, axis=2)  # (n, 4)
+    return -np.sum(_HARTMANN6_ALPHA * np.exp(-inner), axis=1)
+
+BATCH_REGISTRY = {
+    "ackley": ackley_batch,
+    "rosenbrock": rosenbrock_batch,
+    "rastrigin": rastrigin_batch,
+    "sphere": sphere_batch,
+    "beale": beale_batch,
+    "ackley_nd": ackley_nd_batch,
+    "rastrigin_nd": rastrigin_nd_batch,
+    "levy": levy_batch,
+    "styblinski_tang": styblinski_tang_batch,
+    "hartmann6": hartmann6_batch
 }
 
+def _multi_fidelity_batch(name: str):
+    base = BATCH_REGISTRY[name]
+
+    def fn(X: np.ndarray) -> np.ndarray:
+        Z, fidelity = X[:, :-1], X[:, -1]
+        if COST_UNIT_SECONDS:
+            time.sleep(COST_UNIT_SECONDS * np.sum(FIDELITY_COST_INTERCEPT + fidelity))
+        value = base(Z)
+        return value + (1 - fidelity) * FIDELITY_BIAS * (np.abs(value) + 1) * np.sin(Z.sum(axis=1))
+
+    fn.__name__ = name + MULTI_FIDELITY_SUFFIX + "_batch"
+    return fn
+
+# The multi-fidelity variants take the base function's columns plus the fidelity as
+# the last column.
+for _name in list(BATCH_REGISTRY):
+    BATCH_REGISTRY[_name + MULTI_FIDELITY_SUFFIX] = _multi_fidelity_batch(_name)
+
 def get_function_info():
     return {
-        name: func.__doc__.strip() for name, func in REGISTRY.items()
+        name: func.__doc__.strip() + f"\n    Dimensions: {DIMENSIONS[name] or 'any'}"
+        for name, func in REGISTRY.items()
     }
 
 def evaluate(name: str, params: dict) -> float:
     if name not in REGISTRY:
         raise ValueError(f"Function {name} not found.")
-    return REGISTRY[name](params)
\ No newline at end of file
+    check_parameters(name, params)
+    return REGISTRY[name](params)
+
+def timed_evaluate(name: str, params: dict) -> tuple[float, float]:
+    """evaluate() plus its wall time in seconds. Top-level so process pools can pickle it."""
+    start = time.perf_counter()
+    value = evaluate(name, params)
+    return value, time.perf_counter() - start
+
+def to_array(points, names=("x", "y")) -> np.ndarray:
+    """
+    Stack points into an (n, len(names)) float array.
+    Accepts an array/list of rows already in `names` order, or a list of dicts
+    (missing keys default to 0, like the scalar functions).
+    """
+    if isinstance(points, np.ndarray):
+        X = points.astype(float, copy=False)
+    elif len(points) and isinstance(points[0], dict):
+        X = np.array([[p.get(k, 0) for k in names] for p in points], dtype=float)
+    else:
+        X = np.asarray(points, dtype=float)
+    X = np.atleast_2d(X)
+    if X.shape[1] != len(names):
+        raise ValueError(f"Expected points with {len(names)} columns {list(names)}, got shape {X.shape}.")
+    return X
+
+def evaluate_batch(name: str, points) -> np.ndarray:
+    """
+    Evaluate a registered function at many points at once; returns an (n,) array.
+    Dict points are ordered by parameter_names of the first point (x, y for the 2-D functions).
+    Multi-fidelity functions take the fidelity as the last column of row points, or as
+    FIDELITY_PARAMETER in dict points (default 1, like the scalar functions).
+    Dict points are checked like evaluate() checks them and must all name the same parameters.
+    """
+    if name not in BATCH_REGISTRY:
+        raise ValueError(f"Function {name} not found.")
+    if len(points) == 0:
+        return np.empty(0)
+    dim = DIMENSIONS[name]
+    fidelity = (FIDELITY_PARAMETER,) if is_multi_fidelity(name) else ()
+    if isinstance(points[0], dict):
+        keys = points[0].keys() - set(fidelity)
+        if any(p.keys() - set(fidelity) != keys for p in points):
+            raise ValueError("All points must have the same parameter names.")
+        check_parameters(name, points[0])
+        if fidelity:
+            points = [{**p, FIDELITY_PARAMETER: p.get(FIDELITY_PARAMETER, 1.0)} for p in points]
+        first = {k: v for k, v in points[0].items() if k not in fidelity}
+        names = ("x", "y") if dim == 2 and set(first) <= {"x", "y"} else parameter_names(first)
+        names = (*names, *fidelity)
+    elif dim is None:
+        names = range(np.shape(points)[-1])  # rows are used as given
+    else:
+        names = range(dim + len(fidelity))
+    X = to_array(points, names)
+    check_dimensions(name, X.shape[1] - len(fidelity))
+    return BATCH_REGISTRY[name](X)
\ No newline at end of file
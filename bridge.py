@@ -1,112 +1,137 @@
 import asyncio
-import os
-import sys
-from typing import Optional
 
 # Third-party imports
 import ollama
-from mcp import ClientSession, StdioServerParameters
-from mcp.client.stdio import stdio_client
+
+from history import ConversationHistory
+from mcp_connection import connect, server_url, result_text
 
 # CONFIGURATION
 OLLAMA_MODEL = "qwen38B_analyst:latest" # The model we created in step 2
 MCP_SERVER_SCRIPT = "server.py"  # Your Ax MCP server file
+MAX_TOOL_ROUNDS = 10  # model/tool round trips allowed per user message
 
 class AxOllamaBridge:
     def __init__(self):
-        self.history = []
+        self.history = ConversationHistory()
+        self.client = ollama.AsyncClient()
 
     async def run(self):
-        # 1. DEFINE SERVER CONNECTION
-        server_params = StdioServerParameters(
-            command="uv", # Or "python" if not using uv
-            args=["run", MCP_SERVER_SCRIPT], 
-            env=os.environ.copy(),
-        )
-
-        # 2. CONNECT TO MCP SERVER
-        async with stdio_client(server_params) as (read, write):
-            async with ClientSession(read, write) as session:
-                await session.initialize()
-                
-                # 3. DISCOVER TOOLS
-                tools_list = await session.list_tools()
-                print(f"🔗 Connected to Ax Server. Loaded {len(tools_list.tools)} tools.")
-                
-                # 4. CONVERT MCP TOOLS TO OLLAMA FORMAT
-                ollama_tools = [
-                    {
-                        "type": "function",
-                        "function": {
-                            "name": tool.name,
-                            "description": tool.description,
-                            "parameters": tool.inputSchema
-                        }
+        # 1. CONNECT TO MCP SERVER
+        # a shared server if AX_MCP_URL is set, otherwise a private one over stdio
+        async with connect("uv", ["run", MCP_SERVER_SCRIPT]) as session:  # Or "python" if not using uv
+            
+            # 2. DISCOVER TOOLS
+            tools_list = await session.list_tools()
+            print(f"🔗 Connected to Ax Server {server_url() or '(private, stdio)'}. "
+                  f"Loaded {len(tools_list.tools)} tools.")
+            
+            # 3. CONVERT MCP TOOLS TO OLLAMA FORMAT
+            ollama_tools = [
+                {
+                    "type": "function",
+                    "function": {
+                        "name": tool.name,
+                        "description": tool.description,
+                        "parameters": tool.inputSchema
                     }
-                    for tool in tools_list.tools
-                ]
+                }
+                for tool in tools_list.tools
+            ]
 
-                # 5. START CHAT LOOP
-                print(f"🤖 Agent '{OLLAMA_MODEL}' ready. Type 'quit' to exit.")
-                while True:
-                    user_input = input("\n👤 You: ")
-                    if user_input.lower() in ["quit", "exit"]:
-                        break
+            # 4. START CHAT LOOP
+            print(f"🤖 Agent '{OLLAMA_MODEL}' ready. Type 'quit' to exit.")
+            while True:
+                # read stdin off the event loop
+                user_input = await asyncio.to_thread(input, "\n👤 You: ")
+                if user_input.lower() in ["quit", "exit"]:
+                    break
 
-                    self.history.append({"role": "user", "content": user_input})
-                    await self.process_turn(session, ollama_tools)
+                self.history.append({"role": "user", "content": user_input})
+                await self.process_turn(session, ollama_tools)
 
     async def process_turn(self, session, tools):
-        # Send history + tools to Ollama
-        response = ollama.chat(
+        # Loop (instead of recursing) until the model answers without tools
+        for _ in range(MAX_TOOL_ROUNDS):
+            stats = self.history.compact()
+            if stats["saved_this_turn"]:
+                print(f"🧹 History: {stats['tokens_after']} tokens "
+                      f"(saved {stats['saved_this_turn']} this turn, {stats['saved_total']} total)")
+            message = await self.chat(tools)
+            self.history.append(message)
+
+            # CHECK FOR TOOLS
+            if not message.get('tool_calls'):
+                # No tools called, the text response was already streamed
+                return
+
+            # EXECUTE TOOLS (concurrently; results keep the order they were requested in)
+            print(f"\n⚙️  Model requested {len(message['tool_calls'])} tool(s)...")
+            tool_msgs = await asyncio.gather(
+                *(self.call_tool(session, tool_call) for tool_call in message['tool_calls'])
+            )
+            self.history.extend(tool_msgs)
+            # Next round gives the results back to Ollama to interpret
+
+        print(f"\n⚠️  Stopped after {MAX_TOOL_ROUNDS} tool rounds without a final answer.")
+
+    async def chat(self, tools) -> dict:
+        """Stream one Ollama response to the console and return it as a history message."""
+        content = []
+        tool_calls = []
+        started = False
+        stream = await self.client.chat(
             model=OLLAMA_MODEL,
-            messages=self.history,
+            messages=self.history.messages,
             tools=tools,
+            stream=True,
         )
+        async for chunk in stream:
+            msg = chunk['message']
+            if msg.get('content'):
+                if not started:
+                    print("\n🤖 Scientist: ", end="", flush=True)
+                    started = True
+                print(msg['content'], end="", flush=True)
+                content.append(msg['content'])
+            if msg.get('tool_calls'):
+                tool_calls.extend(msg['tool_calls'])
+        if started:
+            print()
 
-        message = response['message']
-        self.history.append(message)
-
-        # CHECK FOR TOOLS
-        if not message.get('tool_calls'):
-            # No tools called, just print the text response
-            print(f"\n🤖 Scientist: {message['content']}")
-            return
-
-        # EXECUTE TOOLS
-        print(f"\n⚙️  Model requested {len(message['tool_calls'])} tool(s)...")
-        
-        for tool_call in message['tool_calls']:
-            fn_name = tool_call['function']['name']
-            fn_args = tool_call['function']['arguments']
-            
-            print(f"   > Executing: {fn_name}({fn_args})")
-            
-            try:
-                # Call the MCP Server
-                result = await session.call_tool(fn_name, arguments=fn_args)
-                
-                # Create the tool result message for Ollama
-                # Note: Ollama expects the role "tool" 
-                tool_msg = {
-                    "role": "tool",
-                    "content": str(result.content),
-                    "name": fn_name,
-                }
-                self.history.append(tool_msg)
-                print(f"   < Result: {str(result.content)}...") # Truncate log
-                
-            except Exception as e:
-                error_msg = f"Error executing {fn_name}: {str(e)}"
-                print(f"   ! {error_msg}")
-                self.history.append({
-                    "role": "tool", 
-                    "content": error_msg, 
-                    "name": fn_name
-                })
-
-        # RECURSIVE CALL: Give results back to Ollama to interpret
-        await self.process_turn(session, tools)
+        message = {"role": "assistant", "content": "".join(content)}
+        if tool_calls:
+            message["tool_calls"] = tool_calls
+        return message
+
+    async def call_tool(self, session, tool_call) -> dict:
+        fn_name = tool_call['function']['name']
+        fn_args = tool_call['function']['arguments']
+
+        print(f"   > Executing: {fn_name}({fn_args})")
+
+        try:
+            # Call the MCP Server
+            result = await session.call_tool(fn_name, arguments=fn_args)
+
+            # Create the tool result message for Ollama
+            # Note: Ollama expects the role "tool" 
+            content = result_text(result)
+            print(f"   < Result: {content}...") # Truncate log
+            return {
+                "role": "tool",
+                "content": content,
+                "name": fn_name,
+            }
+
+        except Exception as e:
+            error_msg = f"Error executing {fn_name}: {str(e)}"
+            print(f"   ! {error_msg}")
+            return {
+                "role": "tool", 
+                "content": error_msg, 
+                "name": fn_name
+            }
 
 if __name__ == "__main__":
     try:
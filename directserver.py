@@ -2,15 +2,23 @@ import asyncio
 import os
 import sys
 import json
+import time
+import pickle
+import hashlib
 from llama_cpp import Llama
 
 # MCP Imports
-from mcp import ClientSession, StdioServerParameters
-from mcp.client.stdio import stdio_client
+from mcp_connection import connect, server_url, result_text
+
+from history import ConversationHistory
 
 # CONFIGURATION
 MODEL_PATH = "models/qwen2.5-14b-instruct-q4_k_m.gguf"  # <--- UPDATE THIS PATH
 MCP_SERVER_SCRIPT = "server.py"
+N_CTX = 8192
+SYSTEM_PROMPT = "You are an autonomous scientist optimized for Ax experiments. Use the provided tools to run benchmarks."
+# KV state of the fixed prefix (system prompt + tool schemas) is saved here, one file per model/prefix
+PROMPT_CACHE_DIR = "prompt_cache"
 
 class AxDirectRunner:
     def __init__(self):
@@ -20,60 +28,102 @@ class AxDirectRunner:
         self.llm = Llama(
             model_path=MODEL_PATH,
             n_gpu_layers=-1, 
-            n_ctx=8192,
+            n_ctx=N_CTX,
             verbose=False
         )
-        self.history = [
-            {"role": "system", "content": "You are an autonomous scientist optimized for Ax experiments. Use the provided tools to run benchmarks."}
-        ]
+        # No set_cache(): llama.cpp already reuses the longest common token prefix with the
+        # previous call, and a cache would save_state() (KV + logits copy) after every turn.
+        self.history = ConversationHistory(
+            [{"role": "system", "content": SYSTEM_PROMPT}],
+            count_tokens=lambda text: len(self.llm.tokenize(text.encode("utf-8"), add_bos=False)),
+        )
         print("✅ Model loaded.")
 
-    async def run(self):
-        # 1. Start the MCP Server
-        server_params = StdioServerParameters(
-            command="python", # or "uv" run
-            args=[MCP_SERVER_SCRIPT],
-            env=os.environ.copy(),
+    def _prefix_cache_path(self, tools) -> str:
+        st = os.stat(MODEL_PATH)
+        key = json.dumps({
+            "model": os.path.abspath(MODEL_PATH),
+            "size": st.st_size,
+            "mtime": st.st_mtime_ns,
+            "n_ctx": N_CTX,
+            "system": SYSTEM_PROMPT,
+            "tools": tools,
+        }, sort_keys=True)
+        return os.path.join(PROMPT_CACHE_DIR, hashlib.sha256(key.encode()).hexdigest()[:16] + ".state")
+
+    def warm_prefix(self, tools):
+        """
+        Get the KV cache for the system prompt + tool schemas into the model: restore it
+        from disk if this model/prefix was seen before, otherwise evaluate it once and save it.
+        Later prompts share this token prefix, so only the conversation tail gets evaluated.
+        """
+        path = self._prefix_cache_path(tools)
+        start = time.perf_counter()
+        if os.path.exists(path):
+            try:
+                with open(path, "rb") as f:
+                    self.llm.load_state(pickle.load(f))
+                print(f"♻️  Restored prompt prefix from {path} in {time.perf_counter() - start:.1f}s.")
+                return
+            except Exception as e:
+                print(f"   ! Could not restore prompt prefix ({e}); re-evaluating.")
+
+        self.llm.create_chat_completion(
+            messages=self.history.messages[:1],
+            tools=tools,
+            tool_choice="auto",
+            max_tokens=1,
         )
+        os.makedirs(PROMPT_CACHE_DIR, exist_ok=True)
+        with open(path + ".tmp", "wb") as f:
+            pickle.dump(self.llm.save_state(), f)
+        os.replace(path + ".tmp", path)
+        print(f"💾 Evaluated prompt prefix in {time.perf_counter() - start:.1f}s, saved to {path}.")
 
-        async with stdio_client(server_params) as (read, write):
-            async with ClientSession(read, write) as session:
-                await session.initialize()
-                
-                # 2. Get Tools
-                mcp_tools = await session.list_tools()
-                
-                # 3. Convert MCP Tools -> OpenAI Format (required by llama-cpp)
-                openai_tools = [
-                    {
-                        "type": "function",
-                        "function": {
-                            "name": tool.name,
-                            "description": tool.description,
-                            "parameters": tool.inputSchema
-                        }
+    async def run(self):
+        # 1. Start the MCP Server (or attach to a shared one if AX_MCP_URL is set)
+        async with connect("python", [MCP_SERVER_SCRIPT]) as session:  # or "uv" run
+            
+            # 2. Get Tools
+            mcp_tools = await session.list_tools()
+            
+            # 3. Convert MCP Tools -> OpenAI Format (required by llama-cpp)
+            openai_tools = [
+                {
+                    "type": "function",
+                    "function": {
+                        "name": tool.name,
+                        "description": tool.description,
+                        "parameters": tool.inputSchema
                     }
-                    for tool in mcp_tools.tools
-                ]
-                
-                print(f"🔗 Connected to MCP. Loaded {len(openai_tools)} tools.")
-                print("🤖 Scientist ready. Type 'quit' to exit.")
+                }
+                for tool in mcp_tools.tools
+            ]
+            
+            print(f"🔗 Connected to MCP {server_url() or '(private, stdio)'}. Loaded {len(openai_tools)} tools.")
+            self.warm_prefix(openai_tools)
+            print("🤖 Scientist ready. Type 'quit' to exit.")
 
-                # 4. Main Chat Loop
-                while True:
-                    user_input = input("\n👤 You: ")
-                    if user_input.lower() in ["quit", "exit"]:
-                        break
+            # 4. Main Chat Loop
+            while True:
+                user_input = input("\n👤 You: ")
+                if user_input.lower() in ["quit", "exit"]:
+                    break
 
-                    self.history.append({"role": "user", "content": user_input})
-                    
-                    # Process the turn (with recursion for tool calls)
-                    await self.process_turn(session, openai_tools)
+                self.history.append({"role": "user", "content": user_input})
+                
+                # Process the turn (with recursion for tool calls)
+                await self.process_turn(session, openai_tools)
 
     async def process_turn(self, session, tools):
+        stats = self.history.compact()
+        if stats["saved_this_turn"]:
+            print(f"🧹 History: {stats['tokens_after']} tokens "
+                  f"(saved {stats['saved_this_turn']} this turn, {stats['saved_total']} total)")
+
         # Call the local model
         response = self.llm.create_chat_completion(
-            messages=self.history,
+            messages=self.history.messages,
             tools=tools,
             tool_choice="auto",
             temperature=0.1  # Low temp for rigorous science
@@ -108,7 +158,7 @@ class AxDirectRunner:
             try:
                 # Call MCP Server
                 result = await session.call_tool(fn_name, arguments=fn_args)
-                result_content = str(result.content)
+                result_content = result_text(result)
 
                 # Append result to history (Role MUST be 'tool' for OpenAI format compatibility)
                 self.history.append({
@@ -0,0 +1,208 @@
+"""
+On-disk memo of objective evaluations, shared by every study and evaluate_benchmark.
+
+A result is keyed by function name, function version (benchmarks.version) and the
+parameters rounded to EVAL_CACHE_DIGITS significant digits, so re-evaluating a
+point another study (or a manual check) already evaluated is a lookup. Entries are
+evicted least recently used once there are more than EVAL_CACHE_MAX_ENTRIES.
+Stochastic objectives (benchmarks.STOCHASTIC) are never cached. Like the trial
+queue, the cache is a SQLite file in ax_experiments/, so several server processes
+can share it.
+"""
+import os
+import json
+import time
+import hashlib
+import sqlite3
+import threading
+
+import benchmarks
+from metrics import metrics
+
+EVAL_CACHE_PATH = os.path.join("ax_experiments", "eval_cache.db")
+EVAL_CACHE_ENABLED = os.environ.get("AX_MCP_EVAL_CACHE", "1") != "0"
+EVAL_CACHE_DIGITS = 12          # parameters equal to this many significant digits share an entry
+EVAL_CACHE_MAX_ENTRIES = 100_000
+EVICT_SLACK = 0.1               # evict 10% below the limit so eviction doesn't run on every insert
+# Trials completed from the cache carry this flag in their run metadata; they cost nothing.
+HIT_METADATA_KEY = "eval_cache_hit"
+# Nor do trials failed without being evaluated (cancelled before they started, or whose
+# queue lease ran out every time), which carry this one.
+NOT_EVALUATED_METADATA_KEY = "not_evaluated"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS evaluations (
+    key TEXT PRIMARY KEY,
+    function TEXT NOT NULL,
+    value REAL NOT NULL,
+    seconds REAL,
+    created REAL NOT NULL,
+    last_used REAL NOT NULL,
+    hits INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS evaluations_lru ON evaluations (last_used);
+"""
+
+
+class EvaluationCache:
+    """
+    SQLite-backed LRU of evaluation results. get_many/put_many work on a whole batch
+    in one transaction; hits and misses are counted per process (see stats()).
+    """
+    def __init__(self, path: str = EVAL_CACHE_PATH, digits: int = EVAL_CACHE_DIGITS,
+                 max_entries: int = EVAL_CACHE_MAX_ENTRIES):
+        self.path = path
+        self.digits = digits
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with self._connect() as db:
+            db.executescript(_SCHEMA)
+
+    def _connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(self.path, timeout=30.0, isolation_level=None)
+
+    def key(self, name: str, params: dict) -> str:
+        rounded = sorted((k, float(f"{float(v):.{self.digits}g}")) for k, v in params.items())
+        return hashlib.sha1(json.dumps([name, benchmarks.version(name), rounded]).encode()).hexdigest()
+
+    def cacheable(self, name: str) -> bool:
+        return benchmarks.is_deterministic(name)
+
+    def get_many(self, name: str, points: dict) -> dict:
+        """{id: value} for the points ({id: params}) already cached; marks them recently used."""
+        if not points or not self.cacheable(name):
+            return {}
+        keys = {self.key(name, p): i for i, p in points.items()}
+        db = self._connect()
+        try:
+            db.execute("BEGIN IMMEDIATE")
+            found = {}
+            keylist = list(keys)
+            for start in range(0, len(keylist), 500):  # SQLite's bound-parameter limit
+                chunk = keylist[start:start + 500]
+                found.update(db.execute(f"SELECT key, value FROM evaluations WHERE key IN "
+                                        f"({','.join('?' * len(chunk))})", chunk).fetchall())
+            now = time.time()
+            db.executemany("UPDATE evaluations SET last_used = ?, hits = hits + 1 WHERE key = ?",
+                           [(now, k) for k in found])
+            db.execute("COMMIT")
+        finally:
+            db.close()
+        with self._lock:
+            self.hits += len(found)
+            self.misses += len(points) - len(found)
+        metrics.incr("eval_cache_hit", n=len(found))
+        metrics.incr("eval_cache_miss", n=len(points) - len(found))
+        return {keys[k]: value for k, value in found.items()}
+
+    def get(self, name: str, params: dict):
+        """The cached value at `params`, or None."""
+        return self.get_many(name, {0: params}).get(0)
+
+    def put_many(self, name: str, results: list[tuple[dict, float, float]]):
+        """Store (params, value, seconds) results, then evict down to the size bound if needed."""
+        if not results or not self.cacheable(name):
+            return
+        now = time.time()
+        rows = [(self.key(name, p), name, float(v), s, now, now) for p, v, s in results
+                if v is not None and v == v]  # NaN results are not worth keeping
+        db = self._connect()
+        try:
+            db.execute("BEGIN IMMEDIATE")
+            db.executemany("INSERT OR REPLACE INTO evaluations (key, function, value, seconds, created, last_used) "
+                           "VALUES (?, ?, ?, ?, ?, ?)", rows)
+            count = db.execute("SELECT COUNT(*) FROM evaluations").fetchone()[0]
+            evicted = 0
+            if count > self.max_entries:
+                evicted = count - int(self.max_entries * (1 - EVICT_SLACK))
+                db.execute("DELETE FROM evaluations WHERE key IN "
+                           "(SELECT key FROM evaluations ORDER BY last_used LIMIT ?)", (evicted,))
+            db.execute("COMMIT")
+        finally:
+            db.close()
+        if evicted:
+            with self._lock:
+                self.evictions += evicted
+            metrics.incr("eval_cache_evicted", n=evicted)
+
+    def put(self, name: str, params: dict, value: float, seconds: float = None):
+        self.put_many(name, [(params, value, seconds)])
+
+    def clear(self):
+        db = self._connect()
+        try:
+            db.execute("DELETE FROM evaluations")
+        finally:
+            db.close()
+
+    def stats(self) -> dict:
+        """Hit/miss counts of this process plus what is on disk, per function."""
+        db = self._connect()
+        try:
+            per_function = {row[0]: {"entries": row[1], "hits": row[2], "seconds_saved": row[3]} for row in db.execute(
+                "SELECT function, COUNT(*), SUM(hits), SUM(hits * COALESCE(seconds, 0)) FROM evaluations "
+                "GROUP BY function")}
+        finally:
+            db.close()
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else None,
+            "evictions": self.evictions,
+            "entries": sum(f["entries"] for f in per_function.values()),
+            "max_entries": self.max_entries,
+            "bytes": os.path.getsize(self.path) if os.path.exists(self.path) else 0,
+            "digits": self.digits,
+            "never_cached": sorted(benchmarks.STOCHASTIC),
+            "functions": per_function,
+        }
+
+
+def is_hit(trial) -> bool:
+    """Whether an Ax trial was completed from the cache rather than evaluated."""
+    return bool(trial.run_metadata.get(HIT_METADATA_KEY))
+
+
+def is_evaluated(trial) -> bool:
+    """False for a trial failed without its objective ever being evaluated."""
+    return not trial.run_metadata.get(NOT_EVALUATED_METADATA_KEY)
+
+
+def trial_cost(name: str, trial) -> float:
+    """benchmarks.evaluation_cost of a trial's evaluation, 0 if it came from the cache or never ran."""
+    if is_hit(trial) or not is_evaluated(trial):
+        return 0.0
+    return benchmarks.evaluation_cost(name, trial.arm.parameters)
+
+
+_default = None
+_default_lock = threading.Lock()
+
+
+def default_cache() -> EvaluationCache | None:
+    """The process-wide cache at EVAL_CACHE_PATH, or None if AX_MCP_EVAL_CACHE=0."""
+    global _default
+    if not EVAL_CACHE_ENABLED:
+        return None
+    with _default_lock:
+        if _default is None:
+            _default = EvaluationCache()
+        return _default
+
+
+def cached_evaluate(name: str, params: dict, cache: EvaluationCache = None) -> tuple[float, bool]:
+    """benchmarks.evaluate through the cache; returns (value, was_cached)."""
+    cache = cache or default_cache()
+    if cache is not None:
+        value = cache.get(name, params)
+        if value is not None:
+            return value, True
+    value, seconds = benchmarks.timed_evaluate(name, params)
+    if cache is not None:
+        cache.put(name, params, value, seconds)
+    return value, False
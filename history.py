@@ -0,0 +1,104 @@
+"""Token-budgeted conversation history shared by bridge.py and directserver.py."""
+
+# Defaults sized for directserver.py's n_ctx=8192, leaving room for tool schemas and the reply.
+TOKEN_BUDGET = 5000
+KEEP_RECENT_TOOL_RESULTS = 3   # newest tool results are always kept verbatim
+OLD_TOOL_RESULT_CHARS = 240    # older ones are cut down to this many characters
+MESSAGE_OVERHEAD_TOKENS = 4    # role markers etc. added by chat templates
+
+
+def approx_tokens(text: str) -> int:
+    """~4 characters per token; used when no tokenizer is available (e.g. Ollama)."""
+    return (len(text) + 3) // 4
+
+
+class ConversationHistory:
+    """
+    Chat messages plus compaction. Call compact() before each model call:
+    1. tool results older than the newest keep_recent_tool_results are truncated
+       (each one only once, when it ages out, so the cached prompt prefix mostly survives);
+    2. if the total is still over token_budget, whole turns (a user message and
+       everything until the next one) are dropped oldest first, keeping system
+       messages and the current turn.
+    """
+    def __init__(self, messages=None, count_tokens=approx_tokens, token_budget=TOKEN_BUDGET,
+                 keep_recent_tool_results=KEEP_RECENT_TOOL_RESULTS,
+                 old_tool_result_chars=OLD_TOOL_RESULT_CHARS):
+        self.messages = list(messages or [])
+        self.count_tokens = count_tokens
+        self.token_budget = token_budget
+        self.keep_recent_tool_results = keep_recent_tool_results
+        self.old_tool_result_chars = old_tool_result_chars
+        self._counts: dict[str, int] = {}
+        self._truncated: set[int] = set()
+        self.dropped_turns = 0
+        self.saved_total = 0
+        self.last_stats = {}
+
+    def append(self, message):
+        self.messages.append(message)
+
+    def extend(self, messages):
+        self.messages.extend(messages)
+
+    def __len__(self):
+        return len(self.messages)
+
+    def _text_tokens(self, text: str) -> int:
+        if text not in self._counts:
+            self._counts[text] = self.count_tokens(text)
+        return self._counts[text]
+
+    def message_tokens(self, message) -> int:
+        n = MESSAGE_OVERHEAD_TOKENS + self._text_tokens(message.get("content") or "")
+        if message.get("tool_calls"):
+            n += self._text_tokens(str(message["tool_calls"]))
+        return n
+
+    def total_tokens(self) -> int:
+        return sum(self.message_tokens(m) for m in self.messages)
+
+    def compact(self) -> dict:
+        """Apply the policy above; returns (and stores in last_stats) token counts for this turn."""
+        before = self.total_tokens()
+        self._truncate_old_tool_results()
+        while self.total_tokens() > self.token_budget and self._drop_oldest_turn():
+            pass
+        after = self.total_tokens()
+        self.saved_total += before - after
+        self.last_stats = {
+            "tokens_before": before,
+            "tokens_after": after,
+            "saved_this_turn": before - after,
+            "saved_total": self.saved_total,
+            "dropped_turns": self.dropped_turns,
+            "messages": len(self.messages),
+        }
+        return self.last_stats
+
+    def _truncate_old_tool_results(self):
+        tool_positions = [i for i, m in enumerate(self.messages) if m.get("role") == "tool"]
+        if self.keep_recent_tool_results:
+            tool_positions = tool_positions[:-self.keep_recent_tool_results]
+        for i in tool_positions:
+            message = self.messages[i]
+            if id(message) in self._truncated:
+                continue
+            content = message.get("content") or ""
+            if len(content) > self.old_tool_result_chars:
+                message = dict(message)
+                message["content"] = (content[:self.old_tool_result_chars]
+                                      + f"... [truncated {len(content) - self.old_tool_result_chars} chars]")
+                self.messages[i] = message
+            self._truncated.add(id(message))
+
+    def _drop_oldest_turn(self) -> bool:
+        user_positions = [i for i, m in enumerate(self.messages) if m.get("role") == "user"]
+        if len(user_positions) < 2:
+            return False  # only the current turn is left
+        start, end = user_positions[0], user_positions[1]
+        for m in self.messages[start:end]:
+            self._truncated.discard(id(m))
+        del self.messages[start:end]
+        self.dropped_turns += 1
+        return True
@@ -0,0 +1,144 @@
+import sys
+import time
+import uuid
+import threading
+
+from metrics import metrics
+
+
+class OptimizationJob:
+    """
+    State of one background optimization run. Progress fields are written by the job thread.
+    best_value/best_trial are the study's best, starting from its best before the job.
+    """
+    def __init__(self, study_name: str, objective_name: str, number_trials: int, batch_size: int,
+                 max_workers: int, executor: str):
+        self.job_id = uuid.uuid4().hex[:8]
+        self.study_name = study_name
+        self.objective_name = objective_name
+        self.number_trials = number_trials
+        self.batch_size = batch_size
+        self.max_workers = max_workers
+        self.executor = executor
+        self.status = "pending"   # pending -> running -> completed | cancelled | failed
+        self.error = None
+        self.completed = 0
+        self.failed = 0
+        self.cost = 0.0
+        self.best_value = None
+        self.best_trial = None
+        self.started = None
+        self.finished = None
+        self.cancel_event = threading.Event()
+        self.thread = None
+
+    def eta_seconds(self):
+        done = self.completed + self.failed
+        if self.status != "running" or done == 0:
+            return None
+        elapsed = time.monotonic() - self.started
+        return elapsed / done * (self.number_trials - done)
+
+    def to_dict(self) -> dict:
+        end = self.finished or time.monotonic()
+        eta = self.eta_seconds()
+        return {
+            "job_id": self.job_id,
+            "study_name": self.study_name,
+            "status": self.status,
+            "completed_trials": self.completed,
+            "failed_trials": self.failed,
+            "requested_trials": self.number_trials,
+            "cost_units": round(self.cost, 6),
+            "best_value": self.best_value,
+            "best_trial": self.best_trial,
+            "elapsed_seconds": round(end - self.started, 2) if self.started else 0.0,
+            "eta_seconds": round(eta, 1) if eta is not None else None,
+            "error": self.error,
+        }
+
+
+class JobManager:
+    """
+    Runs get_next_trials/run_trials loops in background threads so a tool call can
+    return immediately. Jobs live for the lifetime of the server process.
+    Each batch holds the study lock, so tool calls on the same study interleave
+    between batches instead of racing the job.
+    `manager` is an AxStateManager, or a zero-argument callable returning one so the
+    server can create it (and import Ax) lazily.
+    """
+    def __init__(self, manager):
+        self._manager = manager
+        self.jobs: dict[str, OptimizationJob] = {}
+        self._lock = threading.Lock()
+
+    @property
+    def manager(self):
+        return self._manager() if callable(self._manager) else self._manager
+
+    def start(self, study_name: str, objective_name: str, number_trials: int, batch_size: int = 1,
+              max_workers: int = 1, executor: str = "thread") -> OptimizationJob:
+        if number_trials < 1 or batch_size < 1:
+            raise ValueError("number_trials and batch_size must be at least 1.")
+        with self._lock:
+            for job in self.jobs.values():
+                if job.study_name == study_name and job.status in ("pending", "running"):
+                    raise ValueError(f"Job {job.job_id} is already running on '{study_name}'.")
+            job = OptimizationJob(study_name, objective_name, number_trials, batch_size, max_workers, executor)
+            self.jobs[job.job_id] = job
+        job.thread = threading.Thread(target=self._run, args=(job,), name=f"ax-job-{job.job_id}", daemon=True)
+        job.thread.start()
+        return job
+
+    def get(self, job_id: str) -> OptimizationJob:
+        if job_id not in self.jobs:
+            raise ValueError(f"Job '{job_id}' not found.")
+        return self.jobs[job_id]
+
+    def cancel(self, job_id: str) -> OptimizationJob:
+        """Stop after the batch in flight; trials already completed are kept."""
+        job = self.get(job_id)
+        job.cancel_event.set()
+        return job
+
+    def _run(self, job: OptimizationJob):
+        job.status = "running"
+        job.started = time.monotonic()
+        try:
+            while job.completed + job.failed < job.number_trials:
+                if job.cancel_event.is_set():
+                    job.status = "cancelled"
+                    return
+                n = min(job.batch_size, job.number_trials - job.completed - job.failed)
+                with metrics.tool_call("background_job", job.study_name), self.manager.study_lock(job.study_name):
+                    client = self.manager.load_client(job.study_name)
+                    minimize = self.manager.is_minimize(client)
+                    if job.completed + job.failed == 0:
+                        # start from the study's best so far, not just this job's trials
+                        job.best_value, job.best_trial = self.manager.best_observed(client)
+                    trials = self.manager.get_next_trials(client, n)
+                    records = self.manager.run_trials(client, job.objective_name, trials,
+                                                      max_workers=job.max_workers, executor=job.executor)
+                    self.manager.save_client(job.study_name, client)
+                for r in records:
+                    job.cost += r["cost"]
+                    if r.get("running"):
+                        continue  # completed in the background; not counted towards this job
+                    if r["error"] is not None:
+                        job.failed += 1
+                        continue
+                    job.completed += 1
+                    better = (job.best_value is None
+                              or (r["value"] < job.best_value if minimize else r["value"] > job.best_value))
+                    if better:
+                        job.best_value, job.best_trial = r["value"], r["trial_index"]
+                if not records:
+                    # Ax had nothing to generate (e.g. waiting on pending trials)
+                    raise RuntimeError("Ax generated no trials.")
+            job.status = "completed"
+        except Exception as e:
+            job.status = "failed"
+            job.error = str(e)
+            print(f"[jobs] job {job.job_id} on '{job.study_name}' failed: {e}", file=sys.stderr)
+        finally:
+            job.finished = time.monotonic()
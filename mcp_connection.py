@@ -0,0 +1,61 @@
+"""
+How bridge.py, directserver.py and bench_tools.py reach the Ax MCP server: spawn a
+private server over stdio (the default), or attach to a shared one started with
+
+    python server.py --transport streamable-http [--host 127.0.0.1 --port 8000]
+
+by setting AX_MCP_URL (e.g. http://127.0.0.1:8000/mcp, or http://127.0.0.1:8000/sse for
+--transport sse). A shared server keeps its loaded studies and fitted models warm
+across sessions and skips the cold start.
+"""
+import os
+from contextlib import asynccontextmanager
+
+from mcp import ClientSession, StdioServerParameters
+from mcp.client.sse import sse_client
+from mcp.client.stdio import stdio_client
+from mcp.client.streamable_http import streamablehttp_client
+
+SERVER_URL_ENV = "AX_MCP_URL"
+# Tool results stream back over a long-lived response; GP fits and long batches can take a while.
+READ_TIMEOUT_SECONDS = 600
+
+
+def server_url(url: str = None) -> str | None:
+    return url or os.environ.get(SERVER_URL_ENV) or None
+
+
+def result_text(result) -> str:
+    """
+    The text of a CallToolResult, for feeding back to the model. Tool results are
+    already compact JSON; passing str(result.content) instead would wrap every one in
+    TextContent(type='text', text=..., annotations=None, meta=None) and escape it again.
+    """
+    text = "\n".join(item.text for item in result.content if getattr(item, "text", None) is not None)
+    # argument validation errors carry a pydantic docs link per field
+    return "\n".join(line for line in text.split("\n") if not line.lstrip().startswith("For further information visit"))
+
+
+@asynccontextmanager
+async def connect(command: str, args: list[str], url: str = None, cwd: str = None, env: dict = None):
+    """
+    Yields an initialized ClientSession: attached to `url` (or $AX_MCP_URL) if set,
+    otherwise to a server spawned as `command args`.
+    """
+    url = server_url(url)
+    if url is None:
+        params = StdioServerParameters(command=command, args=args, cwd=cwd, env=env or os.environ.copy())
+        async with stdio_client(params) as (read, write):
+            async with ClientSession(read, write) as session:
+                await session.initialize()
+                yield session
+    elif url.rstrip("/").endswith("/sse"):
+        async with sse_client(url, sse_read_timeout=READ_TIMEOUT_SECONDS) as (read, write):
+            async with ClientSession(read, write) as session:
+                await session.initialize()
+                yield session
+    else:
+        async with streamablehttp_client(url, sse_read_timeout=READ_TIMEOUT_SECONDS) as (read, write, _):
+            async with ClientSession(read, write) as session:
+                await session.initialize()
+                yield session
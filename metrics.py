@@ -0,0 +1,200 @@
+"""
+Timing instrumentation for the server hot path.
+
+Phases (load, generate, evaluate, save, ...) are timed with `timer()`; each sample is
+filed under (phase, tool, study), where tool/study come from the thread's current
+tool call (set by `tool_call()`). Exposed through the get_server_metrics tool as
+JSON or Prometheus text, and optionally dumped to METRICS_DUMP_PATH after each call.
+"""
+import io
+import os
+import sys
+import json
+import time
+import pstats
+import cProfile
+import threading
+from collections import deque
+from contextlib import contextmanager
+
+# Histogram bucket upper bounds in seconds (Prometheus-style, cumulative on export).
+BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+RECENT_SAMPLES = 512   # per series, for p50/p95
+METRICS_DUMP_PATH = os.environ.get("AX_MCP_METRICS_FILE")  # *.prom -> Prometheus text, else JSON
+PROFILE_DIR = "profiles"
+
+
+class Histogram:
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.min = None
+        self.max = None
+        self.buckets = [0] * (len(BUCKETS) + 1)  # last one is +Inf
+        self.recent = deque(maxlen=RECENT_SAMPLES)
+
+    def observe(self, seconds: float):
+        self.count += 1
+        self.total += seconds
+        self.min = seconds if self.min is None else min(self.min, seconds)
+        self.max = seconds if self.max is None else max(self.max, seconds)
+        for i, bound in enumerate(BUCKETS):
+            if seconds <= bound:
+                self.buckets[i] += 1
+                break
+        else:
+            self.buckets[-1] += 1
+        self.recent.append(seconds)
+
+    def merge(self, other: "Histogram"):
+        self.count += other.count
+        self.total += other.total
+        for attr, pick in (("min", min), ("max", max)):
+            mine, theirs = getattr(self, attr), getattr(other, attr)
+            setattr(self, attr, theirs if mine is None else mine if theirs is None else pick(mine, theirs))
+        self.buckets = [a + b for a, b in zip(self.buckets, other.buckets)]
+        self.recent.extend(other.recent)
+
+    def summary(self) -> dict:
+        recent = sorted(self.recent)
+        def pct(p):
+            return recent[min(len(recent) - 1, round(p / 100 * (len(recent) - 1)))] * 1000 if recent else None
+        return {
+            "count": self.count,
+            "total_s": round(self.total, 6),
+            "mean_ms": self.total / self.count * 1000 if self.count else None,
+            "p50_ms": pct(50),
+            "p95_ms": pct(95),
+            "min_ms": self.min * 1000 if self.min is not None else None,
+            "max_ms": self.max * 1000 if self.max is not None else None,
+        }
+
+
+class Metrics:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self.histograms: dict[tuple[str, str, str], Histogram] = {}
+        self.counters: dict[tuple[str, str, str], int] = {}
+        self.started = time.time()
+        self._profile_target = None   # tool name ("" = any) to profile on its next call
+        self._profile_lock = threading.Lock()
+        self.profiles: list[dict] = []
+
+    def _context(self, study: str = None) -> tuple[str, str]:
+        tool = getattr(self._local, "tool", None) or "-"
+        return tool, study or getattr(self._local, "study", None) or "-"
+
+    def observe(self, phase: str, seconds: float, study: str = None):
+        key = (phase, *self._context(study))
+        with self._lock:
+            self.histograms.setdefault(key, Histogram()).observe(seconds)
+
+    def incr(self, name: str, study: str = None, n: int = 1):
+        key = (name, *self._context(study))
+        with self._lock:
+            self.counters[key] = self.counters.get(key, 0) + n
+
+    @contextmanager
+    def timer(self, phase: str, study: str = None):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(phase, time.perf_counter() - start, study)
+
+    @contextmanager
+    def tool_call(self, tool: str, study: str = None):
+        """
+        Scope one tool call in this thread: tags nested timers, times the call, profiles if armed.
+        Nested scopes (e.g. queue_status running a reconcile) restore the outer one on exit.
+        """
+        outer = getattr(self._local, "tool", None), getattr(self._local, "study", None)
+        self._local.tool, self._local.study = tool, study
+        profiler = self._start_profile(tool)
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe("tool_total", time.perf_counter() - start, study)
+            if profiler is not None:
+                self._finish_profile(tool, profiler)
+            self._local.tool, self._local.study = outer
+            if METRICS_DUMP_PATH:
+                try:
+                    self.dump(METRICS_DUMP_PATH)
+                except OSError as e:
+                    print(f"[metrics] could not write {METRICS_DUMP_PATH}: {e}", file=sys.stderr)
+
+    def profile_next(self, tool: str = ""):
+        """Capture a cProfile of the next call to `tool` (any tool if empty)."""
+        self._profile_target = tool
+
+    def _start_profile(self, tool: str):
+        if self._profile_target is None or self._profile_target not in ("", tool):
+            return None
+        if not self._profile_lock.acquire(blocking=False):
+            return None  # another call is already being profiled
+        self._profile_target = None
+        profiler = cProfile.Profile()
+        profiler.enable()
+        return profiler
+
+    def _finish_profile(self, tool: str, profiler: cProfile.Profile):
+        try:
+            profiler.disable()
+            os.makedirs(PROFILE_DIR, exist_ok=True)
+            path = os.path.join(PROFILE_DIR, f"{tool}-{time.strftime('%Y%m%d-%H%M%S')}.prof")
+            profiler.dump_stats(path)
+            out = io.StringIO()
+            pstats.Stats(profiler, stream=out).sort_stats("cumulative").print_stats(15)
+            self.profiles.append({"tool": tool, "path": path, "top": out.getvalue()})
+        finally:
+            self._profile_lock.release()
+
+    def snapshot(self, study: str = None) -> dict:
+        """Per-series stats plus roll-ups by (phase, tool) and by (phase, study)."""
+        by_tool, by_study = {}, {}
+        with self._lock:
+            for (phase, tool, st), h in self.histograms.items():
+                if study is None or st == study:
+                    by_tool.setdefault(f"{phase}|{tool}", Histogram()).merge(h)
+                    by_study.setdefault(f"{phase}|{st}", Histogram()).merge(h)
+            counters = [(k, v) for k, v in self.counters.items() if study is None or k[2] == study]
+        return {
+            "uptime_s": round(time.time() - self.started, 1),
+            "by_tool": {k: h.summary() for k, h in sorted(by_tool.items())},
+            "by_study": {k: h.summary() for k, h in sorted(by_study.items())},
+            "counters": {"|".join(k): v for k, v in sorted(counters)},
+            "profiles": [{"tool": p["tool"], "path": p["path"]} for p in self.profiles[-5:]],
+            "last_profile_top": self.profiles[-1]["top"] if self.profiles else None,
+        }
+
+    def prometheus(self) -> str:
+        lines = ["# TYPE ax_mcp_phase_seconds histogram"]
+        with self._lock:
+            items = [(k, h.buckets[:], h.count, h.total) for k, h in sorted(self.histograms.items())]
+            counters = sorted(self.counters.items())
+        for (phase, tool, study), buckets, count, total in items:
+            labels = f'phase="{phase}",tool="{tool}",study="{study}"'
+            cumulative = 0
+            for bound, n in zip(BUCKETS, buckets):
+                cumulative += n
+                lines.append(f'ax_mcp_phase_seconds_bucket{{{labels},le="{bound}"}} {cumulative}')
+            lines.append(f'ax_mcp_phase_seconds_bucket{{{labels},le="+Inf"}} {count}')
+            lines.append(f"ax_mcp_phase_seconds_sum{{{labels}}} {total}")
+            lines.append(f"ax_mcp_phase_seconds_count{{{labels}}} {count}")
+        lines.append("# TYPE ax_mcp_events_total counter")
+        for (name, tool, study), v in counters:
+            lines.append(f'ax_mcp_events_total{{event="{name}",tool="{tool}",study="{study}"}} {v}')
+        return "\n".join(lines) + "\n"
+
+    def dump(self, path: str):
+        text = self.prometheus() if path.endswith(".prom") else json.dumps(self.snapshot(), indent=1)
+        with open(path + ".tmp", "w") as f:
+            f.write(text)
+        os.replace(path + ".tmp", path)
+
+
+# process-wide instance used by ax_manager, jobs and server
+metrics = Metrics()
@@ -0,0 +1,218 @@
+"""
+Headless replay of agent sessions against server.py (no LLM involved).
+
+The tool-call sequence comes from a dialog log ("> Executing: tool({...})" lines, as
+printed by bridge.py and directserver.py) or from a YAML script:
+
+    steps:
+      - tool: create_study
+        args: {study_name: s, objective_name: ackley, parameters: {x: [-3, 3], y: [-3, 3]}, maximize: false}
+      - tool: get_and_complete_next_trial
+        args: {study_name: s, objective_name: ackley, number_loops: 5}
+        repeat: 4
+      - provide_best_parameters: {study_name: s}     # short form
+
+With --agents N, N simulated agents replay the sequence concurrently, each on its own
+copy of the studies (study names get an _a<k> suffix), to measure server throughput
+and per-tool latency under load. The server-side study_wait / executor_wait /
+lock_wait phases from get_server_metrics show where calls queued (behind other calls
+on the same study, for an executor thread, on a study lock); --baseline runs a single
+agent first so the slowdown per tool can be read off directly.
+
+    python replay.py dialogs/dialog.txt --show
+    python replay.py dialogs/session.yaml --agents 8 --baseline
+    python replay.py dialogs/session.yaml --agents 8 --url http://127.0.0.1:8000/mcp
+
+Without --url one server is spawned over stdio in a scratch directory and the
+agents share its session (MCP requests on a session run concurrently); with --url
+every agent opens its own connection to the shared server.
+"""
+import os
+import re
+import ast
+import sys
+import json
+import time
+import asyncio
+import argparse
+import tempfile
+
+from mcp_connection import connect, result_text
+from bench_tools import summarize
+
+SERVER_SCRIPT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "server.py")
+CALL_RE = re.compile(r"^\s*> Executing: (\w+)\((.*)\)\s*$")
+RESULT_RE = re.compile(r"^\s*< Result: (.*?)(\.\.\.)?\s*$")
+# tools renamed since the dialogs were recorded
+RENAMED = {"get_next_trial": "get_and_complete_next_trial"}
+# server-side phases that measure waiting rather than work
+WAIT_PHASES = ("study_wait", "executor_wait", "lock_wait")
+
+
+def _texts(content: str) -> str:
+    """The text fields of a logged "[TextContent(type='text', text=...)]" list, or the line itself."""
+    texts = []
+    for match in re.finditer(r"text=('(?:[^'\\]|\\.)*'|\"(?:[^\"\\]|\\.)*\")", content):
+        texts.append(ast.literal_eval(match.group(1)))
+    return "\n".join(texts) if texts else content
+
+
+def parse_dialog(path: str) -> list[dict]:
+    """[{tool, args, logged, text}] for each call in a dialog log, in order."""
+    calls = []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            call = CALL_RE.match(line)
+            if call:
+                try:
+                    args = ast.literal_eval(call.group(2)) if call.group(2).strip() else {}
+                except (ValueError, SyntaxError):
+                    args = json.loads(call.group(2))
+                calls.append({"tool": call.group(1), "args": args, "logged": None, "text": None})
+                continue
+            result = RESULT_RE.match(line)
+            if result and calls and calls[-1]["logged"] is None:
+                calls[-1]["logged"] = result.group(1)
+                calls[-1]["text"] = _texts(result.group(1))
+    return calls
+
+
+def parse_script(path: str) -> list[dict]:
+    """Calls from a YAML script (see the module docstring), with `repeat` expanded."""
+    import yaml  # only scripts need PyYAML; dialog logs (and token_report.py) don't
+    with open(path, encoding="utf-8") as f:
+        script = yaml.safe_load(f) or {}
+    steps = script.get("steps", []) if isinstance(script, dict) else script
+    calls = []
+    for step in steps:
+        if "tool" in step:
+            tool, args = step["tool"], step.get("args") or {}
+        elif len(step) == 1:
+            (tool, args), = step.items()
+        else:
+            raise ValueError(f"Cannot read step {step}: use {{tool: ..., args: ...}} or {{<tool>: <args>}}.")
+        calls += [{"tool": tool, "args": args or {}} for _ in range(step.get("repeat", 1))]
+    return calls
+
+
+def load_calls(path: str) -> list[dict]:
+    calls = parse_script(path) if path.endswith((".yaml", ".yml")) else parse_dialog(path)
+    return [{**call, "tool": RENAMED.get(call["tool"], call["tool"])} for call in calls]
+
+
+def for_agent(calls: list[dict], suffix: str) -> list[dict]:
+    """The calls with every study_name given `suffix`, so agents don't share studies."""
+    return [{**call, "args": {**call["args"], "study_name": call["args"]["study_name"] + suffix}}
+            if "study_name" in call["args"] else call for call in calls]
+
+
+def is_error(result, text: str) -> bool:
+    return result.isError or text.startswith(("Error", '{"error"'))
+
+
+async def run_agent(session, calls: list[dict], name: str, show: bool = False) -> list[dict]:
+    """Replay `calls` in order; one {tool, seconds, error} record per call."""
+    records = []
+    for call in calls:
+        start = time.perf_counter()
+        try:
+            result = await session.call_tool(call["tool"], arguments=call["args"])
+            text, error = result_text(result), None
+            if is_error(result, text):
+                error = text
+        except Exception as e:  # connection-level failures
+            text, error = "", str(e)
+        records.append({"tool": call["tool"], "seconds": time.perf_counter() - start, "error": error})
+        if show:
+            print(f"[{name}] > {call['tool']}({call['args']})\n[{name}] < {text}", file=sys.stderr)
+    return records
+
+
+async def run_load(calls: list[dict], agents: int, url: str = None, workdir: str = None,
+                   show: bool = False, tag: str = "") -> dict:
+    """Run `agents` concurrent agents; per-tool latency, throughput, errors and server wait phases."""
+    scripts = [for_agent(calls, f"{tag}_a{k}" if agents > 1 or tag else "") for k in range(agents)]
+    start = time.perf_counter()
+    if url:
+        async def own_connection(k):
+            async with connect(sys.executable, [SERVER_SCRIPT], url=url) as session:
+                return await run_agent(session, scripts[k], f"a{k}", show)
+        results = await asyncio.gather(*(own_connection(k) for k in range(agents)))
+        wall = time.perf_counter() - start
+        async with connect(sys.executable, [SERVER_SCRIPT], url=url) as session:
+            server = json.loads(result_text(await session.call_tool("get_server_metrics", arguments={})))
+    else:
+        async with connect(sys.executable, [SERVER_SCRIPT], url=None, cwd=workdir) as session:
+            start = time.perf_counter()  # don't count server start-up
+            results = await asyncio.gather(*(run_agent(session, scripts[k], f"a{k}", show) for k in range(agents)))
+            wall = time.perf_counter() - start
+            server = json.loads(result_text(await session.call_tool("get_server_metrics", arguments={})))
+    records = [r for agent in results for r in agent]
+    tools = {}
+    for r in records:
+        tools.setdefault(r["tool"], []).append(r)
+    return {
+        "agents": agents,
+        "calls": len(records),
+        "wall_s": wall,
+        "calls_per_s": len(records) / wall if wall else None,
+        "errors": sum(r["error"] is not None for r in records),
+        "tools": {tool: {**summarize([r["seconds"] for r in rs]), "errors": sum(r["error"] is not None for r in rs)}
+                  for tool, rs in tools.items()},
+        "server_wait": {key: stats for key, stats in server["by_tool"].items()
+                        if key.split("|")[0] in WAIT_PHASES},
+        "first_errors": [f"{r['tool']}: {r['error'][:200]}" for r in records if r["error"] is not None][:5],
+    }
+
+
+def print_report(report: dict):
+    runs = [report["baseline"]] if report.get("baseline") else []
+    runs.append(report["load"])
+    for run in runs:
+        print(f"\n{run['agents']} agent(s): {run['calls']} calls in {run['wall_s']:.1f}s "
+              f"({run['calls_per_s']:.2f} calls/s), {run['errors']} errors", file=sys.stderr)
+        print(f"{'tool':<30}{'n':>5}{'p50 ms':>10}{'p95 ms':>10}{'max ms':>10}{'errors':>8}", file=sys.stderr)
+        for tool, s in run["tools"].items():
+            print(f"{tool:<30}{s['n']:>5}{s['p50_ms']:>10.1f}{s['p95_ms']:>10.1f}{s['max_ms']:>10.1f}"
+                  f"{s['errors']:>8}", file=sys.stderr)
+        for key, s in run["server_wait"].items():
+            print(f"  server {key:<36} p50 {s['p50_ms']:.1f} ms, max {s['max_ms']:.1f} ms", file=sys.stderr)
+    if report.get("baseline"):
+        base, load = report["baseline"]["tools"], report["load"]["tools"]
+        slowdown = {t: load[t]["p50_ms"] / base[t]["p50_ms"] for t in load if t in base and base[t]["p50_ms"]}
+        print("p50 slowdown vs 1 agent: " + ", ".join(f"{t} x{v:.1f}" for t, v in slowdown.items()),
+              file=sys.stderr)
+
+
+async def main(args) -> dict:
+    calls = [call for path in args.scripts for call in load_calls(path)]
+    if not calls:
+        raise SystemExit(f"No tool calls found in {args.scripts}.")
+    # a shared server may already hold these studies from an earlier run
+    tag = time.strftime("_%H%M%S") if args.url else ""
+    report = {"meta": {"timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"), "scripts": args.scripts,
+                       "calls_per_agent": len(calls), "url": args.url}}
+    if args.baseline and args.agents > 1:
+        workdir = None if args.url else tempfile.mkdtemp(prefix="ax_replay_")
+        report["baseline"] = await run_load(calls, 1, args.url, workdir, args.show, tag + "_base")
+    workdir = None if args.url else args.workdir or tempfile.mkdtemp(prefix="ax_replay_")
+    report["load"] = await run_load(calls, args.agents, args.url, workdir, args.show, tag)
+    return report
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("scripts", nargs="+", help="dialog logs (*.txt) or YAML scripts (*.yaml), run in order")
+    parser.add_argument("--agents", type=int, default=1, help="concurrent simulated agents, each on its own studies")
+    parser.add_argument("--baseline", action="store_true", help="run a single agent first for comparison")
+    parser.add_argument("--url", help="replay against a running shared server instead of spawning one")
+    parser.add_argument("--workdir", help="where a spawned server writes its studies (default: a new temp dir)")
+    parser.add_argument("--show", action="store_true", help="print every call and result")
+    parser.add_argument("--output", help="write the JSON report here")
+    args = parser.parse_args()
+
+    report = asyncio.run(main(args))
+    print_report(report)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
@@ -1,36 +1,183 @@
 # server.py
 from mcp.server.fastmcp import FastMCP
-from ax_manager import AxStateManager
+import os
+import sys
+import json
+import time
+import math
+import asyncio
+import functools
+import contextlib
+import argparse
+import threading
+import concurrent.futures
+from jobs import JobManager
+from trial_queue import TrialQueue, Reconciler, QUEUE_PATH
+from metrics import metrics
 import benchmarks
-from benchmarks import (ackley,rosenbrock,rastrigin,sphere,beale)
+import trial_history
+import study_index
+import eval_cache
+from study_locks import StudyLock
+BENCHMARK_REGISTRY = benchmarks.REGISTRY
 
-BENCHMARK_REGISTRY = {
-    "ackley": ackley,
-    "rosenbrock": rosenbrock,
-    "rastrigin": rastrigin,
-    "sphere": sphere,
-    "beale": beale
-}
+# Threads for blocking Ax work (loading, GP fits, saving). Each study is
+# serialized by manager.study_lock, so independent studies run in parallel.
+# Calls on a busy study queue on an asyncio lock (see offload) rather than
+# holding an executor thread while they wait.
+AX_EXECUTOR_WORKERS = 4
+
+# Importing Ax (and torch/botorch under it) takes seconds, so ax_manager is not
+# imported at module load: tools are registered and answer list_tools right away.
+#   "background": start importing in a thread as the server starts (default)
+#   "lazy":       import on the first tool call that needs Ax
+#   "eager":      import before serving, the old behaviour
+AX_IMPORT_MODE = os.environ.get("AX_MCP_IMPORT", "background")
+
+# Tool results are compact JSON, since every result is re-read by the model on later turns.
+# "minimal" keeps what the agent needs for its next step, with floats cut to
+# SIGNIFICANT_DIGITS; "full" adds per-trial details and diagnostics. Tools that take
+# `verbose` can ask for "full" on a single call.
+TOOL_VERBOSITY = os.environ.get("AX_MCP_VERBOSITY", "minimal")
+SIGNIFICANT_DIGITS = 6
 
 # Initialize Server
 mcp = FastMCP("AxOptimizationAgent")
-manager = AxStateManager()
+_manager = None
+_manager_lock = threading.Lock()
+ax_executor = concurrent.futures.ThreadPoolExecutor(max_workers=AX_EXECUTOR_WORKERS, thread_name_prefix="ax-tool")
+_study_admission: dict[str, asyncio.Lock] = {}
+
+def get_manager():
+    """The AxStateManager, importing Ax on first use (blocks while a warm-up import is running)."""
+    global _manager
+    if _manager is None:
+        with _manager_lock:
+            if _manager is None:
+                start = time.perf_counter()
+                from ax_manager import AxStateManager
+                _manager = AxStateManager()
+                metrics.observe("ax_import", time.perf_counter() - start)
+                print(f"[server] Ax loaded in {time.perf_counter() - start:.2f}s", file=sys.stderr)
+    return _manager
+
+def warm_up():
+    threading.Thread(target=get_manager, name="ax-warmup", daemon=True).start()
+
+jobs = JobManager(get_manager)
+_queue = None
+_reconciler = None
+_queue_lock = threading.Lock()
+
+def get_queue() -> TrialQueue:
+    """The external-worker trial queue, created on first use; also starts the reconciler."""
+    global _queue, _reconciler
+    with _queue_lock:
+        if _queue is None:
+            _queue = TrialQueue(QUEUE_PATH)
+            _reconciler = Reconciler(get_manager, _queue)
+            _reconciler.start()
+    return _queue
+
+def _full(verbose: bool = False) -> bool:
+    return verbose or TOOL_VERBOSITY == "full"
+
+def _clean(value, digits: int = None):
+    """JSON-safe copy: numpy scalars -> Python, NaN/inf -> None, floats rounded to `digits` significant digits."""
+    if isinstance(value, dict):
+        return {str(k): _clean(v, digits) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_clean(v, digits) for v in value]
+    if hasattr(value, "item") and not isinstance(value, str):
+        value = value.item()
+    if isinstance(value, float):
+        if not math.isfinite(value):
+            return None
+        return float(f"{value:.{digits}g}") if digits else value
+    return value
+
+def _result(payload, full: bool = False) -> str:
+    return json.dumps(_clean(payload, None if full else SIGNIFICANT_DIGITS), separators=(",", ":"))
+
+def _error(e) -> str:
+    return _result({"error": str(e)})
+
+def offload(fn):
+    """
+    Make a blocking tool async by running it on ax_executor, keeping the event loop free.
+    Calls naming a study_name first wait their turn on that study's asyncio lock, so
+    calls piling up on one hot study don't take every executor thread from the others.
+    Time spent waiting for the study is recorded as study_wait, time queued for a free
+    executor thread as executor_wait.
+    """
+    def instrumented(admitted, submitted, *args, **kwargs):
+        with metrics.tool_call(fn.__name__, kwargs.get("study_name")):
+            if admitted is not None:
+                metrics.observe("study_wait", submitted - admitted)
+            metrics.observe("executor_wait", time.perf_counter() - submitted)
+            return fn(*args, **kwargs)
+
+    @functools.wraps(fn)
+    async def wrapper(*args, **kwargs):
+        loop = asyncio.get_running_loop()
+        study = kwargs.get("study_name")
+        if not study:
+            return await loop.run_in_executor(ax_executor, functools.partial(
+                instrumented, None, time.perf_counter(), *args, **kwargs))
+        admitted = time.perf_counter()
+        async with _study_admission.setdefault(trial_history.clean_name(study), asyncio.Lock()):
+            return await loop.run_in_executor(ax_executor, functools.partial(
+                instrumented, admitted, time.perf_counter(), *args, **kwargs))
+    return wrapper
 
 @mcp.tool()
-def create_study(study_name: str, objective_name: str, parameters:dict[str, list[float]], maximize: bool = True) -> str:
+@offload
+def create_study(study_name: str, objective_name: str, parameters:dict[str, list[float]], maximize: bool = True,
+                 generation_method: str = "default", profile: str = "default", warmup_trials: int | None = None,
+                 batch_size: int | None = None, time_budget: float | None = None, verbose: bool = False) -> str:
     """
     Initialize a new Ax optimization study.
     Args:
         study_name: Unique identifier for this experiment.
         objective_name: What we are measuring (e.g., 'accuracy', 'latency').
+        parameters: Bounds per parameter, e.g. {"x": [-5, 5], "y": [-5, 5]}. The N-dimensional
+            benchmarks take any number of parameters, e.g. {"x1": [...], ..., "x10": [...]}.
         maximize: True if we want the metric to go up, False for down.
+        generation_method: 'default', 'fast', 'quality' or 'random_search'.
+            Use 'fast' or 'random_search' for high-dimensional studies.
+        profile: How later trials are generated. 'default' (Ax's choice), 'throughput'
+            (short Sobol warm-up, model batches of 4, 10 s generation budget per call after
+            which trials are drawn quasi-randomly) or 'quasi_random' (Sobol only, for cheap
+            objectives).
+        warmup_trials, batch_size, time_budget: Override the profile's Sobol warm-up size,
+            trials per model batch, and generation seconds per call. With a time_budget, trials
+            are generated one batch at a time (one trial each if batch_size is unset) and the
+            budget is checked between batches, so the last model batch can overrun it.
+    Multi-fidelity benchmarks ('<name>_mf') add a 'fidelity' parameter automatically
+    (pass "fidelity": [low, 1] to change its range) and use a cost-aware strategy.
+    Returns the first trial and the resolved profile; verbose=True adds the file path and Ax's prediction.
     """
+    manager = get_manager()
     try:
-        # We create with a dummy parameter because Ax requires at least one.
-        # The LLM will overwrite/add real ones next.
-        return manager.create_experiment(study_name, objective_name,parameters,maximize)
+        with manager.study_lock(study_name):
+            created = manager.create_experiment(study_name, objective_name,parameters,maximize,generation_method,
+                                                profile, warmup_trials=warmup_trials, batch_size=batch_size,
+                                                time_budget_seconds=time_budget)
+            if os.path.exists(QUEUE_PATH):
+                get_queue().forget(study_name)  # rows of an earlier study of this name
     except Exception as e:
-        return f"Error: {str(e)}"
+        return _error(e)
+    first = created["first_trial"][0]
+    payload = {"study": study_name, "trial": first["trial_index"], "parameters": first["parameters"],
+               "value": first["value"], "profile": {k: v for k, v in created["profile"].items() if v is not None}}
+    if first["error"] is not None:
+        payload["error"] = first["error"]
+    if first.get("cached"):
+        payload["cached"] = True
+    if _full(verbose):
+        payload.update(path=created["path"], best_parameters=created["best_parameters"],
+                       prediction=created["prediction"])
+    return _result(payload, _full(verbose))
 
 # @mcp.tool()
 # def add_parameter(study_name: str, param_name: str, param_type: str, bounds: list[float], value_type: str = "float") -> str:
@@ -47,26 +194,442 @@ def create_study(study_name: str, objective_name: str, parameters:dict[str, list
 #         return f"Error adding parameter: {str(e)}"
 
 @mcp.tool()
-def get_and_complete_next_trial(study_name: str,objective_name:str,number_loops:int) -> str:
+@offload
+def get_and_complete_next_trial(study_name: str,objective_name:str,number_loops:int,
+                                max_workers: int = 1, executor: str = "thread", batch_timeout: float | None = None,
+                                verbose: bool = False) -> str:
     """
     Generates the next set of parameters to test.
     Completes a loop of number_loops times.
     Then completes the trials number_loops times.
-    Returns a note for success completion.
+    Returns how many trials were requested, generated and completed, the value of each
+    (by trial index) and the generation time of each batch (seconds; see create_study's
+    profile). If fewer trials were generated than requested, "stopped" says why.
+    Args:
+        max_workers: Evaluate the batch with this many parallel workers (1 = serial, the default;
+            at most 32).
+        executor: 'thread' or 'process' pool when max_workers > 1.
+        batch_timeout: Seconds to wait for the batch. Trials not started by then are marked failed;
+            trials still being evaluated are listed under "running" and completed when they finish.
+        verbose: Also return each trial's parameters, wall time and cost.
+    """
+    manager = get_manager()
+    if objective_name not in BENCHMARK_REGISTRY:
+        return _error(f"Function {objective_name} not found.")
+    try:
+        with manager.study_lock(study_name):
+            client = manager.load_client(study_name)
+            manager.check_objective(client, objective_name)
+            batches = []
+            trials = manager.get_next_trials(client, number_loops, batches)
+            records = manager.run_trials(client, objective_name, trials, max_workers=max_workers,
+                                         executor=executor, timeout=batch_timeout)
+            manager.save_client(study_name, client)
+    except Exception as e:
+        return _error(e)
+    return _result(_trial_records_payload(records, trials, batches, _full(verbose), number_loops), _full(verbose))
+
+def _stop_reason(batches: list[dict]) -> str | None:
+    """Why get_next_trials generated fewer trials than asked, if it did."""
+    return next((b["stopped"] for b in batches if "stopped" in b), None)
+
+def _trial_records_payload(records: list[dict], trials: dict, batches: list[dict], full: bool,
+                           requested: int) -> dict:
+    ok = [r for r in records if r["error"] is None and not r.get("running")]
+    payload = {"completed": len(ok), "requested": requested, "generated": len(trials),
+               "values": {r["trial_index"]: r["value"] for r in ok}}
+    stopped = _stop_reason(batches)
+    if stopped:
+        payload["stopped"] = stopped
+    failed = {r["trial_index"]: r["error"] for r in records if r["error"] is not None}
+    if failed:
+        payload["failed"] = failed
+    running = sorted(r["trial_index"] for r in records if r.get("running"))
+    if running:
+        payload["running"] = running
+    cached = sum(r.get("cached", False) for r in records)
+    if cached:
+        payload["cached"] = cached
+    payload["gen_s"] = [b["seconds"] for b in batches]
+    fallback = sum(b["trials"] for b in batches if b["source"] == "fallback")
+    if fallback:
+        payload["fallback_trials"] = fallback
+    if full:
+        payload["generation"] = batches
+        payload["trials"] = [{**r, "parameters": trials[r["trial_index"]]} for r in records]
+        payload["cost"] = sum(r["cost"] for r in records)
+    return payload
+
+@mcp.tool()
+@offload
+def start_optimization(study_name: str, objective_name: str, number_trials: int, batch_size: int = 1,
+                       max_workers: int = 1, executor: str = "thread") -> str:
+    """
+    Runs number_trials optimization trials in the background and returns a job id immediately.
+    Use job_status to follow progress and cancel_job to stop it.
+    Args:
+        study_name: An existing study.
+        objective_name: The benchmark function to evaluate.
+        number_trials: Total trials to run.
+        batch_size: Trials generated per Ax call (the job can be cancelled between batches).
+        max_workers: Parallel evaluation workers per batch.
+        executor: 'thread' or 'process'.
+    """
+    manager = get_manager()
+    try:
+        if objective_name not in BENCHMARK_REGISTRY:
+            raise ValueError(f"Function {objective_name} not found.")
+        with manager.study_lock(study_name):
+            # fail fast on unknown studies and mismatched objectives
+            manager.check_objective(manager.load_client(study_name), objective_name)
+        job = jobs.start(study_name, objective_name, number_trials, batch_size, max_workers, executor)
+        return _result({"job_id": job.job_id, "study": study_name, "trials": number_trials})
+    except Exception as e:
+        return _error(e)
+
+@mcp.tool()
+@offload
+def enqueue_trials(study_name: str, objective_name: str, number_trials: int) -> str:
+    """
+    Generates number_trials trials and puts them on the trial queue instead of evaluating
+    them here. External workers (`python worker.py`, any number, on any machine sharing
+    ax_experiments/) evaluate them; results are applied to the study automatically.
+    Use queue_status to follow progress.
+    """
+    manager = get_manager()
+    if objective_name not in BENCHMARK_REGISTRY:
+        return _error(f"Function {objective_name} not found.")
+    try:
+        queue = get_queue()
+        with manager.study_lock(study_name):
+            client = manager.load_client(study_name)
+            manager.check_objective(client, objective_name)
+            batches = []
+            trials = manager.get_next_trials(client, number_trials, batches)
+            try:
+                queue.push(study_name, objective_name, trials)
+            except Exception:
+                for trial_index in trials:  # nobody will ever evaluate them
+                    client._experiment.trials[trial_index].update_run_metadata(
+                        {eval_cache.NOT_EVALUATED_METADATA_KEY: True})
+                    client.mark_trial_failed(trial_index=trial_index)
+                raise
+            finally:
+                # written now: once workers see the trials, their indices must not be reused
+                manager.save_client(study_name, client, flush=True)
+        payload = {"study": study_name, "queued": sorted(trials)}
+        if _stop_reason(batches):
+            payload["stopped"] = _stop_reason(batches)
+        return _result(payload)
+    except Exception as e:
+        return _error(e)
+
+@mcp.tool()
+@offload
+def queue_status(study_name: str = "") -> str:
+    """
+    Trial queue progress: trials pending, running, done/failed and reconciled into Ax,
+    plus the workers holding leases. Applies any finished results first.
+    Leave study_name empty for every study.
     """
-    client = manager.load_client(study_name)
     try:
-        trials = client.get_next_trials(max_trials=number_loops)
-        for trial_index, parameters in trials.items():
-            x = parameters["x"]
-            y = parameters["y"]
-            result = BENCHMARK_REGISTRY[objective_name]({"x":x,"y":y})
-            raw_data = {objective_name: result}
-            client.complete_trial(trial_index=trial_index, raw_data=raw_data)
-        manager.save_client(study_name, client) # Save state (trial is now 'running')
-        return 'success'
+        queue = get_queue()
+        applied = _reconciler.reconcile(study_name or None)
+        return _result({**queue.status(study_name or None), "just_reconciled": applied,
+                        "reconciled_total": _reconciler.reconciled})
     except Exception as e:
-        return f"Error generating trial: {str(e)}"
+        return _error(e)
+
+@mcp.tool()
+def job_status(job_id: str = "") -> str:
+    """
+    Progress of a background optimization job: completed trials, the study's best value so far
+    (including trials from before the job) and ETA.
+    Leave job_id empty to list every job in this server.
+    """
+    try:
+        if job_id:
+            return _result(jobs.get(job_id).to_dict())
+        return _result([job.to_dict() for job in jobs.jobs.values()])
+    except Exception as e:
+        return _error(e)
+
+@mcp.tool()
+def cancel_job(job_id: str) -> str:
+    """Cancels a background optimization job after its current batch. Completed trials are kept."""
+    try:
+        job = jobs.cancel(job_id)
+        return _result({"job_id": job.job_id, "cancel_requested": True, "completed": job.completed})
+    except Exception as e:
+        return _error(e)
+
+@mcp.tool()
+@offload
+def get_cost_report(study_name: str, include_curve: bool = False) -> str:
+    """
+    Evaluation cost spent on a study versus the best value found: total cost units,
+    best value observed at full fidelity, and the benchmark's exact value at the best
+    point (with the cost spent to reach it). Multi-fidelity studies pay less per trial.
+    Args:
+        include_curve: Also return cumulative cost and best-so-far after every trial.
+    """
+    manager = get_manager()
+    try:
+        with manager.study_lock(study_name):
+            client = manager.load_client(study_name)
+            return _result(manager.cost_report(client, include_curve))
+    except Exception as e:
+        return _error(e)
+
+def _load_history(study_name: str) -> tuple[dict, dict]:
+    """
+    The study's columnar export. Unsaved trials held by the Client cache are flushed
+    first; the study is only loaded (and Ax imported) when the export is missing or
+    older than the study files, e.g. for studies created before exports existed.
+    """
+    if _manager is not None and _manager.cache is not None and _manager.cache.contains(study_name):
+        _manager.cache.flush(study_name)
+    directory = trial_history.EXPERIMENT_DIR
+    if not trial_history.is_current(directory, study_name):
+        manager = get_manager()
+        with manager.study_lock(study_name):
+            client = manager.load_client(study_name)
+            manager.storage.write_history(study_name, client)
+    with metrics.timer("history_read", study_name):
+        return trial_history.read(trial_history.history_path(directory, study_name))
+
+@mcp.tool()
+@offload
+def get_trial_history(study_name: str, columns: list[str] | None = None, offset: int = 0, limit: int = 20,
+                      status: str = "", sort: str = "trial_index", include_summary: bool = True) -> str:
+    """
+    Reads back the trials of a study one page at a time, without loading the whole study.
+    Returns {"total", "columns", "rows": [[...], ...], "next_offset"} plus a summary
+    (status counts, best trial, min/max/mean/std per column).
+    Args:
+        columns: Subset of trial_index, status, the parameter names, value, sem, cost, best_so_far
+            (default: all).
+        offset, limit: Page window (limit at most 200).
+        status: Only trials with this status, e.g. "COMPLETED" or "FAILED".
+        sort: Column to sort by; "value" sorts best first, anything else ascending.
+        include_summary: Set False when paging through a study whose summary you already have.
+    """
+    try:
+        meta, data = _load_history(study_name)
+        names = columns or None
+        payload = {"study": study_name, **trial_history.page(meta, data, names, max(0, offset),
+                                                            max(1, min(limit, 200)), status or None, sort)}
+        if include_summary:
+            payload["summary"] = trial_history.summary(meta, data, payload["columns"])
+        return _result(payload)
+    except Exception as e:
+        return _error(e)
+
+def _flush_studies():
+    """
+    Write out cached studies that aren't in use, so their files (and index entries) are
+    current. Studies busy in another call are skipped rather than waited for; archiving
+    one flushes it under its lock anyway (_exclusive).
+    """
+    if _manager is not None and _manager.cache is not None:
+        _manager.cache.flush(blocking=False)
+
+def _study_busy(study_name: str) -> str | None:
+    """Why the study can't be archived right now, or None."""
+    if any(job.study_name == study_name and job.status in ("pending", "running") for job in jobs.jobs.values()):
+        return "an optimization job is running"
+    if os.path.exists(QUEUE_PATH):
+        counts = get_queue().status(study_name)["counts"]
+        if any(n for status, n in counts.items() if status != "reconciled"):
+            return "it has trials on the trial queue"
+    return None
+
+def _backfill_index(index: study_index.StudyIndex, entries: dict) -> dict:
+    """
+    Studies saved before the index existed, with no history export, have no trial counts
+    yet. Load each of them once (this imports Ax) to write its export and index entry.
+    A study that fails to load is recorded as such and only retried once its files change.
+    """
+    missing = [name for name, e in entries.items() if not e.get("archived") and e.get("trials") is None
+               and (e.get("load_failed") is None or e.get("load_failed") != e.get("modified"))]
+    if not missing:
+        return entries
+    manager = get_manager()
+    for name in missing:
+        try:
+            with manager.study_lock(name):
+                manager.storage.write_history(name, manager.load_client(name))
+        except Exception as e:
+            print(f"[server] could not index '{name}': {e}", file=sys.stderr)
+            index.record_load_failure(name, str(e), entries[name].get("modified"))
+    return index.scan()
+
+@contextlib.contextmanager
+def _exclusive(study_name: str):
+    """Hold the study's lock with nothing of it kept in memory, so its files can be moved."""
+    if _manager is not None:
+        with _manager.study_lock(study_name):
+            _manager.release_study(study_name)
+            yield
+    else:  # Ax not loaded: nothing cached, just keep other processes out
+        with StudyLock(trial_history.study_file(trial_history.EXPERIMENT_DIR, study_name, ".lock")):
+            yield
+
+@mcp.tool()
+@offload
+def list_studies(include_archived: bool = False, sort: str = "modified", limit: int = 50,
+                 verbose: bool = False) -> str:
+    """
+    Lists the saved studies from the study index, without loading any of them (studies
+    saved by older versions are loaded once to index them).
+    Rows are [study, trials, best value, days since last change, kB on disk, archived];
+    totals cover every study.
+    Args:
+        include_archived: Also list studies moved to ax_experiments/archive/ by archive_study.
+        sort: "modified" (newest first), "name", "size" (largest first) or "trials" (most first).
+        limit: At most this many rows.
+        verbose: Full index entries (objective, direction, completed/failed counts, ...) instead of rows.
+    """
+    keys = {"modified": lambda e: -(e[1].get("modified") or 0), "name": lambda e: e[0],
+            "size": lambda e: -(e[1].get("bytes") or e[1].get("archive_bytes") or 0),
+            "trials": lambda e: -(e[1].get("trials") or 0)}
+    try:
+        if sort not in keys:
+            raise ValueError(f"Cannot sort by '{sort}'. Use one of {list(keys)}.")
+        _flush_studies()
+        index = study_index.StudyIndex(trial_history.EXPERIMENT_DIR)
+        entries = _backfill_index(index, index.scan())
+        now = time.time()
+        active = {n: e for n, e in entries.items() if not e.get("archived")}
+        archived = {n: e for n, e in entries.items() if e.get("archived")}
+        shown = sorted((entries if include_archived else active).items(), key=keys[sort])[:max(1, limit)]
+        payload = {"studies": len(active), "active_kb": sum(e.get("bytes") or 0 for e in active.values()) / 1e3,
+                   "archived": len(archived),
+                   "archive_kb": sum(e.get("archive_bytes") or 0 for e in archived.values()) / 1e3}
+        if _full(verbose):
+            payload["entries"] = dict(shown)
+        else:
+            payload["columns"] = ["study", "trials", "best", "age_days", "kb", "archived"]
+            payload["rows"] = [[name, e.get("trials"), e.get("best_value"),
+                                round((now - e["modified"]) / study_index.DAY_SECONDS, 2) if e.get("modified") else None,
+                                round(((e.get("archive_bytes") if e.get("archived") else e.get("bytes")) or 0) / 1e3, 1),
+                                bool(e.get("archived"))] for name, e in shown]
+        return _result(payload, _full(verbose))
+    except Exception as e:
+        return _error(e)
+
+@mcp.tool()
+@offload
+def archive_study(study_name: str = "", older_than_days: float | None = None, max_active_mb: float | None = None,
+                  purge_archives_older_than_days: float | None = None, dry_run: bool = False) -> str:
+    """
+    Moves studies out of ax_experiments/ into archive/<study>.tar.gz (restore_study brings
+    one back). Give study_name for one study, or a retention policy for all of them.
+    Studies with a running job or trials on the trial queue are skipped.
+    Args:
+        study_name: Archive just this study.
+        older_than_days: Archive every study not modified for this many days.
+        max_active_mb: Archive the least recently modified studies until the rest fit in this many MB.
+        purge_archives_older_than_days: Also delete archives made more than this many days ago.
+            This cannot be undone.
+        dry_run: Only report what would be archived or deleted.
+    """
+    try:
+        directory = trial_history.EXPERIMENT_DIR
+        index = study_index.StudyIndex(directory)
+        _flush_studies()
+        entries = index.scan()
+        if study_name:
+            key = trial_history.clean_name(study_name)
+            if key not in entries:
+                raise ValueError(f"Experiment '{study_name}' not found.")
+            names = [] if entries[key].get("archived") else [study_name]
+        elif older_than_days is None and max_active_mb is None and purge_archives_older_than_days is None:
+            raise ValueError("Give study_name, older_than_days, max_active_mb or purge_archives_older_than_days.")
+        else:
+            names = study_index.select_for_retention(
+                entries, older_than_days, None if max_active_mb is None else int(max_active_mb * 1e6))
+        archived, skipped = [], {}
+        for name in names:
+            busy = _study_busy(name)
+            if busy:
+                skipped[name] = busy
+                continue
+            if dry_run:
+                archived.append({"study": name, "freed_bytes": entries[trial_history.clean_name(name)].get("bytes")})
+                continue
+            with _exclusive(name):
+                archived.append(study_index.archive(directory, name, index))
+                if os.path.exists(QUEUE_PATH):
+                    get_queue().forget(name)  # only reconciled rows are left (see _study_busy)
+        payload = {"archived": [a["study"] for a in archived],
+                   "freed_kb": sum(a["freed_bytes"] or 0 for a in archived) / 1e3, "dry_run": dry_run}
+        if study_name and not names:
+            payload["already_archived"] = [study_name]
+        if skipped:
+            payload["skipped"] = skipped
+        if purge_archives_older_than_days is not None:
+            payload["purged"] = study_index.purge_archives(directory, purge_archives_older_than_days, index, dry_run)
+        return _result(payload)
+    except Exception as e:
+        return _error(e)
+
+@mcp.tool()
+@offload
+def restore_study(study_name: str) -> str:
+    """Brings back a study archived by archive_study, so it can be used again."""
+    try:
+        directory = trial_history.EXPERIMENT_DIR
+        with _exclusive(study_name):
+            restored = study_index.restore(directory, study_name, study_index.StudyIndex(directory))
+        return _result({"study": study_name, "kb": restored["bytes"] / 1e3})
+    except Exception as e:
+        return _error(e)
+
+@mcp.tool()
+def get_server_metrics(format: str = "json", study_name: str = "") -> str:
+    """
+    Where server time goes: latency stats (count, p50/p95, max) per phase
+    (load, generate, evaluate, complete, save, best_point, tool_total), rolled up
+    per tool and per study, plus cache hit/miss counters.
+    Args:
+        format: 'json' or 'prometheus'.
+        study_name: Only include this study (json format only).
+    """
+    if format == "prometheus":
+        return metrics.prometheus()
+    snapshot = metrics.snapshot(study_name or None)
+    snapshot["ax_loaded"] = _manager is not None
+    return _result(snapshot, full=True)
+
+@mcp.tool()
+def profile_next_call(tool_name: str = "") -> str:
+    """
+    Captures a cProfile of the next call to tool_name (any Ax tool if empty).
+    The .prof path and top functions show up in get_server_metrics afterwards.
+    """
+    metrics.profile_next(tool_name)
+    return _result({"profiling": tool_name or "any"})
+
+@mcp.tool()
+@offload
+def eval_cache_stats(clear: bool = False) -> str:
+    """
+    Hit/miss counts of the shared evaluation cache (results of earlier evaluations, from
+    any study or evaluate_benchmark, are reused instead of recomputed), entries and
+    time saved per function.
+    Args:
+        clear: Drop every cached result (e.g. after changing a benchmark function).
+    """
+    cache = eval_cache.default_cache()
+    if cache is None:
+        return _result({"enabled": False})
+    try:
+        if clear:
+            cache.clear()
+        return _result({"enabled": True, **cache.stats()})
+    except Exception as e:
+        return _error(e)
 
 # @mcp.tool()
 # def complete_trial(study_name: str, trial_index: int, metric_value: float) -> str:
@@ -82,43 +645,89 @@ def get_and_complete_next_trial(study_name: str,objective_name:str,number_loops:
 #         return f"Error completing trial: {str(e)}"
 
 @mcp.tool()
-def list_available_functions() -> str:
+def list_available_functions(verbose: bool = False) -> str:
     """
     Returns a list of available optimization benchmark functions 
     and their descriptions/recommended bounds.
+    verbose=True returns the full descriptions (global minimum etc.).
     """
-    return str(benchmarks.get_function_info())
+    if _full(verbose):
+        return _result(benchmarks.get_function_info(), full=True)
+    return _result({
+        name: {"about": fn.__doc__.strip().split("\n")[0], "dims": benchmarks.DIMENSIONS[name] or "any",
+               "bounds": benchmarks.BOUNDS[name]}
+        for name, fn in benchmarks.REGISTRY.items()
+    })
 
 @mcp.tool()
+@offload
 def evaluate_benchmark(function_name: str, parameters: dict[str, float]) -> str:
     """
     Calculates the value of a benchmark function for specific parameters.
     Use this outside of an Ax study to show benchmark functionality.  
     Args:
-        function_name: Must be one of 'ackley', 'rosenbrock', 'rastrigin', 'sphere', 'beale'.
-        parameters: A dictionary of floats, e.g. {"x": 1.5, "y": -0.5}.
+        function_name: One of the names from list_available_functions.
+        parameters: A dictionary of floats, e.g. {"x": 1.5, "y": -0.5} or {"x1": ..., "x6": ...}.
+    """
+    try:
+        value, cached = eval_cache.cached_evaluate(function_name, parameters)
+        payload = {"function": function_name, "value": value}
+        if cached:
+            payload["cached"] = True
+        return _result(payload)
+    except Exception as e:
+        return _error(e)
+
+@mcp.tool()
+@offload
+def evaluate_benchmark_batch(function_name: str, points: list[dict[str, float]] | list[list[float]], include_values: bool = False) -> str:
+    """
+    Evaluates a benchmark function at many points in one call (vectorized).
+    Use this for landscape scans or random-search baselines instead of calling
+    evaluate_benchmark once per point.
+    Args:
+        function_name: One of the names from list_available_functions.
+        points: Either a list of dicts like [{"x": 1.5, "y": -0.5}, ...] or a list of rows
+            ([x, y] pairs, or one value per dimension for the N-dimensional functions). For the
+            multi-fidelity '<name>_mf' functions add "fidelity" to each dict (default 1) or as the
+            last value of each row.
+        include_values: If True, also return every value (can be long). Otherwise only summary statistics.
     """
     try:
-        result = benchmarks.evaluate(function_name, parameters)
-        return f"Function '{function_name}' result: {result}"
+        values = benchmarks.evaluate_batch(function_name, points)
+        if not len(values):
+            return _result({"function": function_name, "n": 0, **({"values": []} if include_values else {})})
+        i_min, i_max = int(values.argmin()), int(values.argmax())
+        out = {"function": function_name, "n": len(values), "min": values[i_min], "argmin": i_min,
+               "max": values[i_max], "argmax": i_max, "mean": values.mean(), "std": values.std()}
+        if include_values:
+            out["values"] = values.tolist()
+        return _result(out)
     except Exception as e:
-        return f"Error evaluating function: {str(e)}"
+        return _error(e)
 
 @mcp.tool()
-def provide_best_parameters(study_name:str) -> str:
+@offload
+def provide_best_parameters(study_name:str, verbose: bool = False) -> str:
     """
     From the trials of the active ax study_name, provides the best parameters 
     and the prediction of the objective function with these parameters
+    as [mean, sem]. verbose=True adds the trial index and arm name.
     """
-    client = manager.load_client(study_name)
-    best_parameters, prediction, index, name = client.get_best_parameterization()
-    outstring = f''
-    for x in best_parameters.keys():
-        outstring = outstring + f'{x}: {best_parameters[x]}'
+    manager = get_manager()
+    try:
+        with manager.study_lock(study_name):
+            client = manager.load_client(study_name)
+            best_parameters, prediction, index, name = manager.get_best_parameterization(study_name, client)
+    except Exception as e:
+        return _error(e)
     pk = list(prediction.keys())[0]
-    outstring = outstring + f'. {prediction[pk][0]}, {prediction[pk][1]}'
-    print(outstring)
-    return outstring
+    payload = {"parameters": best_parameters, "predicted": list(prediction[pk])}
+    if _full(verbose):
+        payload.update(trial=index, arm=name, metric=pk)
+    # stdout is the MCP stdio channel
+    print(f"[best] {study_name}: {payload}", file=sys.stderr)
+    return _result(payload, _full(verbose))
 
 
 # @mcp.tool()
@@ -161,4 +770,43 @@ def provide_best_parameters(study_name:str) -> str:
 #         return f"Optimization loop failed: {str(e)}"
 
 if __name__ == "__main__":
-    mcp.run()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Ax optimization MCP server")
+    parser.add_argument("--transport", choices=["stdio", "streamable-http", "sse"], default="stdio",
+                        help="stdio: one private server per client (default); streamable-http/sse: one "
+                             "shared server that many runners attach to via AX_MCP_URL")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--allowed-host", action="append", default=[], metavar="HOST",
+                        help="Host name or address runners use to reach this server, if not the bind "
+                             "address (repeatable); other Host/Origin headers are rejected")
+    args = parser.parse_args()
+    mcp.settings.host, mcp.settings.port = args.host, args.port
+    if args.host not in ("127.0.0.1", "localhost", "::1") or args.allowed_host:
+        # FastMCP only accepts localhost Host headers by default. Keep its DNS-rebinding
+        # protection on and also accept the bind address and any --allowed-host.
+        from mcp.server.transport_security import TransportSecuritySettings
+        names = ["127.0.0.1", "localhost", "[::1]"]
+        if args.host not in ("0.0.0.0", "::"):
+            names.append(f"[{args.host}]" if ":" in args.host else args.host)
+        elif not args.allowed_host:
+            print("[server] bound to all interfaces: only local runners are accepted unless the "
+                  "server's address is given with --allowed-host", file=sys.stderr)
+        names += [f"[{h}]" if h.count(":") > 1 and not h.startswith("[") else h for h in args.allowed_host]
+        mcp.settings.transport_security = TransportSecuritySettings(
+            enable_dns_rebinding_protection=True,
+            allowed_hosts=[h for name in names for h in (name, f"{name}:*")],
+            allowed_origins=[f"{scheme}://{name}{port}" for name in names for scheme in ("http", "https")
+                             for port in ("", ":*")],
+        )
+    if args.transport != "stdio":
+        print(f"[server] serving {args.transport} on http://{args.host}:{args.port}"
+              f"{mcp.settings.streamable_http_path if args.transport == 'streamable-http' else mcp.settings.sse_path}",
+              file=sys.stderr)
+
+    if AX_IMPORT_MODE == "eager":
+        get_manager()
+    elif AX_IMPORT_MODE == "background":
+        warm_up()
+    if os.path.exists(QUEUE_PATH):
+        get_queue()  # pick up results workers reported while the server was down
+    mcp.run(transport=args.transport)
\ No newline at end of file
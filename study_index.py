@@ -0,0 +1,251 @@
+"""
+Catalogue of the studies in ax_experiments/, and their archives.
+
+ax_experiments/_index.json holds one entry per study (trial counts, best value,
+objective, bytes on disk, last modification), keyed like the study's files
+(trial_history.clean_name). The storage backends refresh a study's entry on every
+save (the trial-log backend from just the appended trials), so listing studies never
+deserializes a Client. Studies saved before the index
+existed are added by scan() from their history export (trial_history.py), or from
+their file stats if they have none.
+
+archive() bundles all of a study's files into ax_experiments/archive/<study>.tar.gz
+and removes them; restore() unpacks them again. select_for_retention() picks the
+studies to archive by age, or to bring the active studies under a size budget.
+This module does not import Ax.
+"""
+import os
+import json
+import time
+import tarfile
+
+import trial_history
+from study_locks import StudyLock
+
+INDEX_FILE = "_index.json"
+ARCHIVE_DIR = "archive"
+SNAPSHOT_SUFFIXES = (".json.gz", ".json")
+# every file a study can have (see study_storage.py and trial_history.py)
+STUDY_SUFFIXES = SNAPSHOT_SUFFIXES + (".trials.jsonl", trial_history.HISTORY_SUFFIX)
+DAY_SECONDS = 24 * 3600
+
+
+def study_files(directory: str, name: str) -> list[str]:
+    paths = (trial_history.study_file(directory, name, suffix) for suffix in STUDY_SUFFIXES)
+    return [p for p in paths if os.path.exists(p)]
+
+
+def archive_path(directory: str, name: str) -> str:
+    return trial_history.study_file(os.path.join(directory, ARCHIVE_DIR), name, ".tar.gz")
+
+
+def discover(directory: str) -> set[str]:
+    """Names of the studies with a snapshot in `directory`."""
+    names = set()
+    for f in os.listdir(directory) if os.path.isdir(directory) else []:
+        for suffix in SNAPSHOT_SUFFIXES:
+            if f.endswith(suffix) and f != INDEX_FILE and not f.endswith(".trials.jsonl"):
+                names.add(f[:-len(suffix)])
+                break
+    return names
+
+
+def file_stats(directory: str, name: str) -> dict:
+    """Bytes of all of the study's files; last modification of its data (not of the derived history export)."""
+    files = study_files(directory, name)
+    return {"bytes": sum(os.path.getsize(p) for p in files),
+            "modified": max((os.path.getmtime(p) for p in files if not p.endswith(trial_history.HISTORY_SUFFIX)),
+                            default=None)}
+
+
+def history_entry(meta: dict, columns: dict) -> dict:
+    """Index fields derived from a study's history columns (trial_history.read/write)."""
+    status, value = columns["status"], columns["value"]
+    entry = {"objective": meta["objective"], "minimize": meta["minimize"], "trials": int(len(status)),
+             "completed": int((status == "COMPLETED").sum()), "failed": int((status == "FAILED").sum()),
+             "best_value": None, "best_trial": None}
+    done = [i for i in range(len(value)) if value[i] == value[i]]  # not NaN
+    if done:
+        best = min(done, key=lambda i: value[i]) if meta["minimize"] else max(done, key=lambda i: value[i])
+        entry["best_value"], entry["best_trial"] = float(value[best]), int(columns["trial_index"][best])
+    return entry
+
+
+class StudyIndex:
+    """
+    The index file. Every read-modify-write holds ax_experiments/_index.lock (an OS
+    file lock, like the study locks), so server processes sharing the directory don't
+    lose each other's updates.
+    """
+    def __init__(self, directory: str):
+        self.directory = directory
+        self.path = os.path.join(directory, INDEX_FILE)
+        self._lock = StudyLock(os.path.join(directory, "_index.lock"))
+
+    def _read(self) -> dict:
+        try:
+            with open(self.path) as f:
+                return json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return {}
+
+    def _write(self, data: dict):
+        tmp = self.path + ".tmp"
+        with open(tmp, "w") as f:
+            json.dump(data, f, separators=(",", ":"))
+        os.replace(tmp, self.path)
+
+    def entries(self) -> dict:
+        return self._read()
+
+    def update(self, name: str, **fields):
+        key = trial_history.clean_name(name)
+        with self._lock:
+            data = self._read()
+            data[key] = {**data.get(key, {}), **fields}
+            self._write(data)
+
+    def remove(self, name: str):
+        with self._lock:
+            data = self._read()
+            if data.pop(trial_history.clean_name(name), None) is not None:
+                self._write(data)
+
+    def record_save(self, name: str, meta: dict, columns: dict):
+        """Called by the storage backends after each save."""
+        self.update(name, **history_entry(meta, columns), **file_stats(self.directory, name), archived=False,
+                    load_error=None, load_failed=None)
+
+    def record_append(self, name: str, records: list[dict]):
+        """
+        Called by the trial-log backend after appending finished trials: counts and best
+        value are updated from just those records, so the save stays independent of the
+        study's length. Entries that don't have counts yet only get their file stats.
+        """
+        key = trial_history.clean_name(name)
+        with self._lock:
+            data = self._read()
+            entry = data.setdefault(key, {})
+            if entry.get("trials") is not None and "objective" in entry:
+                better = (lambda a, b: a < b) if entry["minimize"] else (lambda a, b: a > b)
+                for rec in records:
+                    entry["trials"] = max(entry["trials"], rec["trial_index"] + 1)
+                    entry["completed"] = entry.get("completed", 0) + (rec["status"] == "COMPLETED")
+                    entry["failed"] = entry.get("failed", 0) + (rec["status"] == "FAILED")
+                    value = rec["raw_data"].get(entry["objective"], [None])[0]
+                    if value is not None and (entry.get("best_value") is None or better(value, entry["best_value"])):
+                        entry["best_value"], entry["best_trial"] = float(value), rec["trial_index"]
+            entry.update(file_stats(self.directory, name), archived=False, load_error=None, load_failed=None)
+            self._write(data)
+
+    def record_load_failure(self, name: str, error: str, modified: float):
+        """Remember that the study's files as of `modified` could not be loaded, so they aren't retried."""
+        self.update(name, load_error=error, load_failed=modified)
+
+    def scan(self) -> dict:
+        """
+        Reconcile the index with the directory: add studies it doesn't know, refresh
+        sizes and modification times, and drop entries whose files are gone.
+        """
+        with self._lock:
+            data = self._read()
+            for name in [n for n in data if trial_history.clean_name(n) != n]:  # keyed by raw name before
+                key = trial_history.clean_name(name)
+                data[key] = {**data.pop(name), **data.get(key, {})}
+            on_disk = discover(self.directory)
+            for name in on_disk:
+                entry = data.get(name, {})
+                if "trials" not in entry:
+                    history = trial_history.history_path(self.directory, name)
+                    if os.path.exists(history):
+                        entry.update(history_entry(*trial_history.read(history)))
+                    else:
+                        entry.update(trials=None, best_value=None)
+                entry.update(file_stats(self.directory, name), archived=False)
+                data[name] = entry
+            for name in list(data):
+                if name in on_disk:
+                    continue
+                if data[name].get("archived") and os.path.exists(archive_path(self.directory, name)):
+                    continue
+                del data[name]
+            self._write(data)
+            return data
+
+
+def archive(directory: str, name: str, index: StudyIndex) -> dict:
+    """Move a study's files into archive/<name>.tar.gz. The caller holds the study's lock."""
+    files = study_files(directory, name)
+    if not any(p.endswith(SNAPSHOT_SUFFIXES) for p in files):
+        raise ValueError(f"Experiment '{name}' not found.")
+    target = archive_path(directory, name)
+    if os.path.exists(target):
+        raise ValueError(f"'{name}' already has an archive at {target}; restore or delete it first.")
+    os.makedirs(os.path.dirname(target), exist_ok=True)
+    freed = sum(os.path.getsize(p) for p in files)
+    with tarfile.open(target + ".tmp", "w:gz") as tar:
+        for p in files:
+            tar.add(p, arcname=os.path.basename(p))
+    os.replace(target + ".tmp", target)
+    for p in files:
+        os.remove(p)
+    index.update(name, archived=True, archive=target, archived_at=time.time(), bytes=0,
+                 archive_bytes=os.path.getsize(target))
+    return {"study": name, "archive": target, "freed_bytes": freed, "archive_bytes": os.path.getsize(target)}
+
+
+def restore(directory: str, name: str, index: StudyIndex) -> dict:
+    """Unpack archive/<name>.tar.gz back into the directory. The caller holds the study's lock."""
+    source = archive_path(directory, name)
+    if not os.path.exists(source):
+        raise ValueError(f"No archive for '{name}'.")
+    if any(p.endswith(SNAPSHOT_SUFFIXES) for p in study_files(directory, name)):
+        raise ValueError(f"Experiment '{name}' already exists; archive or rename it first.")
+    expected = {os.path.basename(trial_history.study_file(directory, name, s)) for s in STUDY_SUFFIXES}
+    with tarfile.open(source, "r:gz") as tar:
+        for member in tar.getmembers():
+            if member.isfile() and member.name in expected:  # never write outside the directory
+                tar.extract(member, directory)
+    os.remove(source)
+    index.update(name, archived=False, archive=None, archived_at=None, archive_bytes=None,
+                 **file_stats(directory, name))
+    return {"study": name, **file_stats(directory, name)}
+
+
+def select_for_retention(entries: dict, older_than_days: float = None, max_active_bytes: int = None,
+                         now: float = None) -> list[str]:
+    """
+    Active studies to archive: those not modified for older_than_days, then the least
+    recently modified others until the active ones fit in max_active_bytes.
+    """
+    now = now or time.time()
+    active = sorted(((e.get("modified") or 0, name, e.get("bytes") or 0) for name, e in entries.items()
+                     if not e.get("archived")))
+    chosen = []
+    if older_than_days is not None:
+        chosen = [name for modified, name, _ in active if now - modified > older_than_days * DAY_SECONDS]
+    if max_active_bytes is not None:
+        total = sum(size for _, name, size in active if name not in chosen)
+        for _, name, size in active:
+            if total <= max_active_bytes:
+                break
+            if name not in chosen:
+                chosen.append(name)
+                total -= size
+    return chosen
+
+
+def purge_archives(directory: str, older_than_days: float, index: StudyIndex, dry_run: bool = False) -> list[str]:
+    """Delete archives made more than older_than_days ago; returns the study names."""
+    archive_dir = os.path.join(directory, ARCHIVE_DIR)
+    purged = []
+    now = time.time()
+    for f in sorted(os.listdir(archive_dir)) if os.path.isdir(archive_dir) else []:
+        path = os.path.join(archive_dir, f)
+        if f.endswith(".tar.gz") and now - os.path.getmtime(path) > older_than_days * DAY_SECONDS:
+            name = f[:-len(".tar.gz")]
+            purged.append(name)
+            if not dry_run:
+                os.remove(path)
+                index.remove(name)
+    return purged
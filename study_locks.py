@@ -0,0 +1,104 @@
+import time
+import threading
+
+from metrics import metrics
+
+try:
+    import fcntl
+    msvcrt = None
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+
+def _lock_file(path: str, blocking: bool = True):
+    """Exclusive OS lock on `path`; returns the open handle, or None if busy and not blocking."""
+    fh = open(path, "a+")
+    try:
+        if fcntl is not None:
+            flags = fcntl.LOCK_EX if blocking else fcntl.LOCK_EX | fcntl.LOCK_NB
+            fcntl.flock(fh, flags)
+        else:
+            fh.seek(0)
+            while True:
+                try:
+                    msvcrt.locking(fh.fileno(), msvcrt.LK_NBLCK, 1)
+                    break
+                except OSError:
+                    if not blocking:
+                        raise BlockingIOError(path)
+                    threading.Event().wait(0.05)
+        return fh
+    except BlockingIOError:
+        fh.close()
+        return None
+    except Exception:
+        fh.close()
+        raise
+
+
+def _unlock_file(fh):
+    try:
+        if fcntl is not None:
+            fcntl.flock(fh, fcntl.LOCK_UN)
+        else:
+            fh.seek(0)
+            msvcrt.locking(fh.fileno(), msvcrt.LK_UNLCK, 1)
+    finally:
+        fh.close()
+
+
+class StudyLock:
+    """
+    Re-entrant lock for one study: a threading.RLock for threads in this process plus,
+    if lock_path is set, an OS file lock held while the outermost acquire is active so
+    several server processes sharing ax_experiments/ serialize their updates too.
+    on_release runs just before the outermost release (used to flush write-behind state
+    so the next process to take the lock sees it on disk).
+    """
+    def __init__(self, lock_path: str = None, on_release=None):
+        self.lock_path = lock_path
+        self.on_release = on_release
+        self._rlock = threading.RLock()
+        self._depth = 0
+        self._fh = None
+
+    def acquire(self, blocking: bool = True) -> bool:
+        start = time.perf_counter()
+        if not self._rlock.acquire(blocking=blocking):
+            return False
+        if self._depth == 0 and self.lock_path is not None:
+            try:
+                self._fh = _lock_file(self.lock_path, blocking=blocking)
+            except Exception:
+                self._rlock.release()
+                raise
+            if self._fh is None:
+                self._rlock.release()
+                return False
+        if blocking and self._depth == 0:
+            # contention between tool calls (or server processes) on the same study
+            metrics.observe("lock_wait", time.perf_counter() - start)
+        self._depth += 1
+        return True
+
+    def release(self):
+        try:
+            if self._depth == 1:
+                try:
+                    if self.on_release is not None:
+                        self.on_release()
+                finally:
+                    if self._fh is not None:
+                        _unlock_file(self._fh)
+                        self._fh = None
+        finally:
+            self._depth -= 1
+            self._rlock.release()
+
+    def __enter__(self):
+        self.acquire()
+        return self
+
+    def __exit__(self, *exc):
+        self.release()
@@ -0,0 +1,352 @@
+import os
+import sys
+import gzip
+import json
+import math
+import threading
+import numpy as np
+import pandas as pd
+from ax.api.client import Client
+from ax.core.data import Data
+
+import eval_cache
+import trial_history
+from study_index import StudyIndex
+
+# Trials in these states never change again, so they can go to the append-only log.
+TERMINAL_STATUSES = ("COMPLETED", "FAILED", "ABANDONED")
+# Fold the trial log back into the snapshot after this many appended trials.
+COMPACT_EVERY = 50
+# Snapshots are ~10x smaller gzipped; level 6 keeps writing them cheap.
+GZIP_LEVEL = 6
+
+
+def _raw_size(path: str) -> int:
+    """Size of a file, uncompressed for .gz (read from the gzip trailer, which holds it mod 4 GiB)."""
+    if not path.endswith(".gz"):
+        return os.path.getsize(path)
+    with open(path, "rb") as f:
+        f.seek(-4, os.SEEK_END)
+        return int.from_bytes(f.read(4), "little")
+
+
+def _experiment(client: Client):
+    return client._experiment
+
+
+def _trial_records(experiment, indices: list[int]) -> list[dict]:
+    """Parameters, status, raw data and cost flags (see eval_cache) of trials as plain JSON-able dicts."""
+    raw_data = {i: {} for i in indices}
+    # one lookup for the whole batch; per-trial lookups re-sort the experiment's data each time
+    df = experiment.lookup_data(trial_indices=indices).df
+    for row in df.itertuples():
+        sem = None if row.sem is None or math.isnan(row.sem) else float(row.sem)
+        raw_data[row.trial_index][row.metric_name] = [float(row.mean), sem]
+    return [{
+        "trial_index": i,
+        "status": experiment.trials[i].status.name,
+        "parameters": dict(experiment.trials[i].arm.parameters),
+        "raw_data": raw_data[i] if experiment.trials[i].status.name == "COMPLETED" else {},
+        "cached": eval_cache.is_hit(experiment.trials[i]),
+        "evaluated": eval_cache.is_evaluated(experiment.trials[i]),
+    } for i in indices]
+
+
+class JsonStudyStorage:
+    """
+    One full Client JSON file per study (the original ax_experiments/ layout), gzipped
+    as <study>.json.gz when `compress` is set. Either form is read; an uncompressed
+    snapshot is replaced by a compressed one (and vice versa) the next time it is written.
+    Every save also refreshes the study's history export and index entry.
+    """
+    def __init__(self, directory: str, compress: bool = True):
+        self.directory = directory
+        self.compress = compress
+        os.makedirs(directory, exist_ok=True)
+        self.index = StudyIndex(directory)
+
+    def _file(self, name: str, suffix: str) -> str:
+        return trial_history.study_file(self.directory, name, suffix)
+
+    def path(self, name: str) -> str:
+        """Where the snapshot is written."""
+        return self._file(name, ".json.gz" if self.compress else ".json")
+
+    def snapshot_path(self, name: str) -> str | None:
+        """The existing snapshot, compressed or not, or None."""
+        for suffix in (".json.gz", ".json"):
+            if os.path.exists(self._file(name, suffix)):
+                return self._file(name, suffix)
+        return None
+
+    def history_path(self, name: str) -> str:
+        return trial_history.history_path(self.directory, name)
+
+    def log_path(self, name: str) -> str:
+        return self._file(name, ".trials.jsonl")
+
+    def lock_path(self, name: str) -> str:
+        return self._file(name, ".lock")
+
+    def _files(self, name: str) -> list[str]:
+        paths = (self._file(name, ".json.gz"), self._file(name, ".json"), self.log_path(name))
+        return [p for p in paths if os.path.exists(p)]
+
+    def exists(self, name: str) -> bool:
+        return self.snapshot_path(name) is not None
+
+    def forget(self, name: str):
+        """Drop any per-study state (the study was archived or removed behind our back)."""
+
+    def mtime(self, name: str):
+        """Latest modification time (ns) over the study's files, None if missing."""
+        files = self._files(name)
+        return max(os.stat(p).st_mtime_ns for p in files) if files else None
+
+    def size(self, name: str) -> int:
+        """Uncompressed bytes of the study's files, so compression doesn't change what a study weighs."""
+        return sum(_raw_size(p) for p in self._files(name))
+
+    def load(self, name: str) -> Client:
+        if not self.exists(name):
+            raise ValueError(f"Experiment '{name}' not found.")
+        if os.path.exists(self.log_path(name)):
+            raise ValueError(f"Experiment '{name}' has an uncompacted trial log; "
+                             f"run `python study_storage.py compact {name}` or use the trial_log backend.")
+        return self._read_snapshot(name)
+
+    def save(self, name: str, client: Client):
+        self._write_snapshot(name, client)
+        self.write_history(name, client)
+
+    def _read_snapshot(self, name: str) -> Client:
+        path = self.snapshot_path(name)
+        opener = gzip.open if path.endswith(".gz") else open
+        with opener(path, "rt") as f:
+            return Client._from_json_snapshot(snapshot=json.load(f))
+
+    def _write_snapshot(self, name: str, client: Client):
+        path = self.path(name)
+        tmp = path + ".tmp"
+        text = json.dumps(client._to_json_snapshot())
+        if self.compress:
+            with gzip.open(tmp, "wt", compresslevel=GZIP_LEVEL) as f:
+                f.write(text)
+        else:
+            with open(tmp, "w") as f:
+                f.write(text)
+        os.replace(tmp, path)
+        other = self._file(name, ".json" if self.compress else ".json.gz")
+        if os.path.exists(other):
+            os.remove(other)
+
+    def write_history(self, name: str, client: Client):
+        """
+        Refresh the columnar export (see trial_history.py) and the study's index entry.
+        Both are derived data, so failures only warn.
+        """
+        try:
+            meta, columns = trial_history.write(client, self.history_path(name))
+            self.index.record_save(name, meta, columns)
+        except Exception as e:
+            print(f"[study_storage] could not export history of '{name}': {e}", file=sys.stderr)
+
+
+class TrialLogStudyStorage(JsonStudyStorage):
+    """
+    Snapshot + append-only trial log.
+    <name>.json.gz is a regular Client snapshot, <name>.trials.jsonl holds one line per
+    trial that reached a terminal state since that snapshot. Saving a study whose only
+    change is newly finished trials appends those lines instead of rewriting the study,
+    and updates its index entry from them; the history export is only rewritten with
+    the snapshot.
+    Existing ax_experiments/*.json files are valid snapshots with an empty log.
+    """
+    def __init__(self, directory: str, compress: bool = True, compact_every: int = COMPACT_EVERY):
+        super().__init__(directory, compress)
+        self.compact_every = compact_every
+        # per study (keyed by trial_history.clean_name, like the files): {trial_index: status}
+        # as of the last load/save, and log length
+        self._persisted: dict[str, dict[int, str]] = {}
+        self._log_lines: dict[str, int] = {}
+        # one lock per study, so one study's snapshot and log I/O doesn't hold up the others
+        self._locks: dict[str, threading.Lock] = {}
+        self._locks_guard = threading.Lock()
+
+    def _lock(self, name: str) -> threading.Lock:
+        with self._locks_guard:
+            return self._locks.setdefault(trial_history.clean_name(name), threading.Lock())
+
+    def load(self, name: str) -> Client:
+        key = trial_history.clean_name(name)
+        if not self.exists(name):
+            raise ValueError(f"Experiment '{name}' not found.")
+        client = self._read_snapshot(name)
+        records = self._read_log(name)
+        # a crash between snapshot and log truncation leaves already-folded records
+        n_snapshot = len(_experiment(client).trials)
+        self._replay(client, [rec for rec in records if rec["trial_index"] >= n_snapshot])
+        with self._lock(name):
+            self._persisted[key] = self._statuses(client)
+            self._log_lines[key] = len(records)
+        return client
+
+    def save(self, name: str, client: Client):
+        key = trial_history.clean_name(name)
+        with self._lock(name):
+            current = self._statuses(client)
+            persisted = self._persisted.get(key)
+            new = self._appendable(current, persisted)
+            if new is None or not self.exists(name) \
+                    or self._log_lines.get(key, 0) + len(new) > self.compact_every:
+                self._compact(name, client, current)
+                self.write_history(name, client)
+                return
+            if not new:
+                return
+            experiment = _experiment(client)
+            records = _trial_records(experiment, new)
+            with open(self.log_path(name), "a") as f:
+                for rec in records:
+                    f.write(json.dumps(rec) + "\n")
+                f.flush()
+                os.fsync(f.fileno())
+            persisted.update({i: current[i] for i in new})
+            self._log_lines[key] = self._log_lines.get(key, 0) + len(new)
+        # The history export is rebuilt at compaction (or by get_trial_history once it is
+        # older than the log, see trial_history.is_current); rebuilding it here would make
+        # every append linear in the study's length again.
+        try:
+            self.index.record_append(name, records)
+        except Exception as e:
+            print(f"[study_storage] could not index '{name}': {e}", file=sys.stderr)
+
+    def forget(self, name: str):
+        key = trial_history.clean_name(name)
+        with self._lock(name):
+            self._persisted.pop(key, None)
+            self._log_lines.pop(key, None)
+
+    def compact(self, name: str, client: Client = None):
+        """Write a fresh snapshot (loading the study if no client is given) and drop the log."""
+        if client is None:
+            client = self.load(name)
+        with self._lock(name):
+            self._compact(name, client, self._statuses(client))
+
+    def _compact(self, name, client, statuses):
+        key = trial_history.clean_name(name)
+        self._write_snapshot(name, client)
+        if os.path.exists(self.log_path(name)):
+            os.remove(self.log_path(name))
+        self._persisted[key] = statuses
+        self._log_lines[key] = 0
+
+    @staticmethod
+    def _statuses(client: Client) -> dict[int, str]:
+        return {i: t.status.name for i, t in _experiment(client).trials.items()}
+
+    @staticmethod
+    def _appendable(current, persisted):
+        """Indices of new terminal trials, or None when a full snapshot is needed."""
+        if persisted is None:
+            return None
+        if any(current.get(i) != s for i, s in persisted.items()):
+            return None
+        new = sorted(set(current) - set(persisted))
+        if new != list(range(len(persisted), len(current))):
+            return None
+        if any(current[i] not in TERMINAL_STATUSES for i in new):
+            return None
+        return new
+
+    def _read_log(self, name: str) -> list[dict]:
+        path = self.log_path(name)
+        if not os.path.exists(path):
+            return []
+        records = []
+        with open(path) as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    records.append(json.loads(line))
+                except json.JSONDecodeError:
+                    # torn final write; everything before it is intact
+                    print(f"[study_storage] ignoring truncated record in {path}", file=sys.stderr)
+                    break
+        return records
+
+    @staticmethod
+    def _replay(client: Client, records: list[dict]):
+        """
+        Re-attach logged trials. Data for all completed trials goes in with a single
+        attach_data; Client.complete_trial per trial re-validates and re-sorts the whole
+        dataset each time, which made replaying a 50-trial log take seconds.
+        Metrics the experiment doesn't have yet are added as tracking metrics first,
+        as Client.complete_trial does when the trials are first completed.
+        """
+        experiment = _experiment(client)
+        logged = {m for rec in records if rec["status"] == "COMPLETED" for m in rec["raw_data"]}
+        extra = logged - set(experiment.metrics)
+        if extra:
+            client.configure_tracking_metrics(metric_names=sorted(extra))
+        templates = {}  # metric -> one data row built by Ax, so columns match this Ax version
+        rows, completed = [], []
+        for rec in records:
+            index = client.attach_trial(parameters=rec["parameters"])
+            if index != rec["trial_index"]:
+                raise ValueError(f"Trial log out of order: expected trial {rec['trial_index']}, got {index}.")
+            trial = experiment.trials[index]
+            if rec.get("cached"):
+                trial.update_run_metadata({eval_cache.HIT_METADATA_KEY: True})
+            if not rec.get("evaluated", True):
+                trial.update_run_metadata({eval_cache.NOT_EVALUATED_METADATA_KEY: True})
+            if rec["status"] == "COMPLETED":
+                for metric, (mean, sem) in rec["raw_data"].items():
+                    if metric not in templates:
+                        value = (mean, sem) if sem is not None else mean
+                        data = trial._raw_evaluations_to_data(raw_data={trial.arm.name: [(np.nan, {metric: value})]})
+                        templates[metric] = data.df.iloc[0].to_dict()
+                    row = dict(templates[metric])
+                    row.update(trial_index=index, arm_name=trial.arm.name, mean=mean,
+                               sem=np.nan if sem is None else sem)
+                    rows.append(row)
+                completed.append(trial)
+            elif rec["status"] == "FAILED":
+                client.mark_trial_failed(trial_index=index)
+            elif rec["status"] == "ABANDONED":
+                client.mark_trial_abandoned(trial_index=index)
+        if rows:
+            experiment.attach_data(Data(df=pd.DataFrame(rows)))
+        for trial in completed:
+            trial.mark_completed()
+
+
+STORAGE_BACKENDS = {
+    "json": JsonStudyStorage,
+    "trial_log": TrialLogStudyStorage,
+}
+
+
+def make_storage(backend: str, directory: str, compress: bool = True):
+    if backend not in STORAGE_BACKENDS:
+        raise ValueError(f"Unknown storage backend '{backend}'. Choose from {list(STORAGE_BACKENDS)}.")
+    return STORAGE_BACKENDS[backend](directory, compress)
+
+
+if __name__ == "__main__":
+    # python study_storage.py compact [study ...]
+    # Folds trial logs into their snapshots, e.g. before switching back to the json backend.
+    from ax_manager import EXPERIMENT_DIR
+    if len(sys.argv) < 2 or sys.argv[1] != "compact":
+        print("usage: python study_storage.py compact [study ...]")
+        sys.exit(1)
+    storage = TrialLogStudyStorage(EXPERIMENT_DIR)
+    names = sys.argv[2:] or [
+        f[:-len(".trials.jsonl")] for f in os.listdir(EXPERIMENT_DIR) if f.endswith(".trials.jsonl")
+    ]
+    for n in names:
+        storage.compact(n)
+        print(f"compacted {n}")
@@ -0,0 +1,33 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+pytest.importorskip("ax")
+
+import ax_manager
+
+
+@pytest.fixture
+def manager(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    os.makedirs(ax_manager.EXPERIMENT_DIR)
+    monkeypatch.setattr(ax_manager, "MULTI_FIDELITY_FANTASIES", 4)
+    return ax_manager.AxStateManager(cache=False, evaluation_cache=False)
+
+
+@pytest.mark.parametrize("acqf", ["kg", "mes"])
+def test_several_trials_past_sobol(manager, monkeypatch, acqf):
+    monkeypatch.setattr(ax_manager, "MULTI_FIDELITY_ACQF", acqf)
+    manager.create_experiment("mf", "sphere_mf", {"x": [-5, 5], "y": [-5, 5]}, maximize=False,
+                              warmup_trials=2)
+    client = manager.load_client("mf")
+    manager.run_trials(client, "sphere_mf", manager.get_next_trials(client, 1))
+
+    # the model generates these jointly, and the second call has a running trial pending
+    batches = []
+    trials = manager.get_next_trials(client, 2, batches)
+    assert len(trials) == 2
+    assert all(b["source"] != "GenerationStep_0_Sobol" for b in batches)
+    assert len(manager.get_next_trials(client, 2)) == 2
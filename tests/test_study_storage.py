@@ -0,0 +1,65 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+pytest.importorskip("ax")
+
+import ax_manager
+from study_storage import TrialLogStudyStorage
+
+
+@pytest.fixture
+def manager(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    os.makedirs(ax_manager.EXPERIMENT_DIR)
+    return ax_manager.AxStateManager(cache=False, evaluation_cache=False)
+
+
+def trials(client) -> dict:
+    """trial_index -> (status, parameters, value) of every trial."""
+    df = client._experiment.lookup_data().df
+    values = dict(zip(df["trial_index"], df["mean"]))
+    return {i: (t.status.name, t.arm.parameters, values.get(i)) for i, t in client._experiment.trials.items()}
+
+
+def test_trial_log_round_trip(manager):
+    manager.create_experiment("log", "sphere", {"x": [-5, 5], "y": [-5, 5]}, generation_method="random_search")
+    client = manager.load_client("log")
+    for _ in range(3):
+        manager.run_trials(client, "sphere", manager.get_next_trials(client, 2))
+        manager.save_client("log", client)
+    failed = list(manager.get_next_trials(client, 1))[0]
+    client.mark_trial_failed(trial_index=failed)
+    manager.save_client("log", client)
+
+    storage = manager.storage
+    assert isinstance(storage, TrialLogStudyStorage)
+    with open(storage.log_path("log")) as f:
+        assert len(f.readlines()) == 7  # appended, not folded into the snapshot
+
+    reloaded = TrialLogStudyStorage(ax_manager.EXPERIMENT_DIR).load("log")
+    assert trials(reloaded) == trials(client)
+    assert reloaded._experiment.trials[failed].status.name == "FAILED"
+
+
+def test_cache_flushes_on_close(tmp_path, monkeypatch, request):
+    monkeypatch.chdir(tmp_path)
+    os.makedirs(ax_manager.EXPERIMENT_DIR)
+    manager = ax_manager.AxStateManager(evaluation_cache=False, flush_interval=3600)
+    request.addfinalizer(manager.close)  # in tmp_path, not at exit in the working directory
+    manager.create_experiment("cached", "sphere", {"x": [-5, 5], "y": [-5, 5]}, generation_method="random_search")
+
+    def on_disk():
+        return len(ax_manager.AxStateManager(cache=False).load_client("cached")._experiment.trials)
+
+    created = on_disk()
+    with manager.study_lock("cached"):
+        client = manager.load_client("cached")
+        manager.run_trials(client, "sphere", manager.get_next_trials(client, 3))
+        manager.save_client("cached", client)
+
+    assert on_disk() == created  # write-behind: the new trials are only in the cache
+    manager.close()
+    assert on_disk() == created + 3
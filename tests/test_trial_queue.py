@@ -0,0 +1,31 @@
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from trial_queue import TrialQueue
+
+LEASE = 0.2
+
+
+def test_expired_lease_is_requeued_then_failed(tmp_path):
+    queue = TrialQueue(str(tmp_path / "queue.db"), lease_seconds=LEASE, max_attempts=2)
+    queue.push("study", "sphere", {0: {"x": 1.0}})
+
+    first = queue.claim("w1")
+    assert first["trial_index"] == 0 and first["attempts"] == 1
+    assert queue.claim("w2") is None  # leased to w1
+
+    time.sleep(LEASE * 1.5)  # w1 stops heartbeating
+    second = queue.claim("w2")
+    assert second["id"] == first["id"] and second["worker"] == "w2" and second["attempts"] == 2
+    # w1 lost the lease: its heartbeat and late result are ignored
+    assert not queue.heartbeat(first["id"], "w1")
+    assert not queue.report(first["id"], "w1", value=1.0)
+
+    time.sleep(LEASE * 1.5)  # w2 disappears too: out of attempts
+    assert queue.claim("w3") is None
+    [row] = queue.results()["study"]
+    assert row["status"] == "failed" and row["cost"] is None
+    assert "lease expired" in row["error"]
@@ -0,0 +1,71 @@
+"""
+How many prompt tokens the tool results in recorded dialogs cost.
+
+Reads the "> Executing: tool({...})" / "< Result: [TextContent(...)]" pairs that
+bridge.py and directserver.py print, and for every tool compares what used to go
+back to the model (str(result.content), TextContent wrapper included) with just the
+text. With --replay the same calls are run against a fresh server (in a temp dir)
+so the sizes of today's compact results can be compared with the recorded ones
+(replay.py runs the same calls for timing and load tests).
+
+    python token_report.py dialogs/*.txt
+    python token_report.py dialogs/dialog.txt --replay
+"""
+import sys
+import json
+import asyncio
+import argparse
+import tempfile
+
+from history import approx_tokens
+from mcp_connection import connect, result_text
+from replay import parse_dialog, RENAMED, SERVER_SCRIPT
+
+
+async def replay(calls: list[dict]):
+    """Run the calls against a fresh server; stores each new result under "replayed"."""
+    workdir = tempfile.mkdtemp(prefix="ax_tokens_")
+    async with connect(sys.executable, [SERVER_SCRIPT], url=None, cwd=workdir) as session:
+        for call in calls:
+            result = await session.call_tool(RENAMED.get(call["tool"], call["tool"]), arguments=call["args"])
+            call["replayed"] = result_text(result)
+
+
+def report(calls: list[dict]) -> dict:
+    """Per-tool token totals: logged (with wrapper), text only, and replayed if available."""
+    tools = {}
+    for call in calls:
+        if call["logged"] is None:
+            continue
+        row = tools.setdefault(RENAMED.get(call["tool"], call["tool"]),
+                               {"calls": 0, "logged": 0, "text": 0, "replayed": 0})
+        row["calls"] += 1
+        row["logged"] += approx_tokens(call["logged"])
+        row["text"] += approx_tokens(call["text"])
+        row["replayed"] += approx_tokens(call.get("replayed", ""))
+    return tools
+
+
+def print_report(tools: dict, replayed: bool):
+    columns = ["calls", "logged", "text"] + (["replayed"] if replayed else [])
+    print(f"{'tool':<30}" + "".join(f"{c:>9}" for c in columns))
+    totals = {c: sum(row[c] for row in tools.values()) for c in columns}
+    for name, row in sorted(tools.items()) + [("total", totals)]:
+        print(f"{name:<30}" + "".join(f"{row[c]:>9}" for c in columns))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("dialogs", nargs="+", help="dialog logs (e.g. dialogs/*.txt)")
+    parser.add_argument("--replay", action="store_true", help="re-run the calls against a fresh server")
+    parser.add_argument("--json", action="store_true", help="print the report as JSON")
+    args = parser.parse_args()
+
+    calls = [call for path in args.dialogs for call in parse_dialog(path)]
+    if args.replay:
+        asyncio.run(replay(calls))
+    tools = report(calls)
+    if args.json:
+        print(json.dumps(tools, indent=2))
+    else:
+        print_report(tools, args.replay)
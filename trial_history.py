@@ -0,0 +1,169 @@
+"""
+Columnar trial history kept next to each study (ax_experiments/<study>.history.npz).
+
+The storage backends rewrite it whenever they persist a study, so reading the
+history of a study is a NumPy array read instead of deserializing the Ax Client.
+Every column is a flat 1-D array of the same length (pandas.DataFrame(dict(...))
+turns it into a frame that can go straight to Parquet):
+
+    trial_index, status, <one column per parameter>, value, sem, cost, best_so_far
+
+plus a "__meta__" entry holding the objective name, direction and parameter names
+as JSON. This module does not import Ax, so the server can answer history queries
+before Ax is loaded.
+"""
+import os
+import json
+import numpy as np
+
+import eval_cache
+
+EXPERIMENT_DIR = "ax_experiments"   # ax_manager.EXPERIMENT_DIR, without importing Ax
+HISTORY_SUFFIX = ".history.npz"
+# files whose changes make the export stale (see study_storage.py)
+STUDY_SUFFIXES = (".json.gz", ".json", ".trials.jsonl")
+FIXED_COLUMNS = ("trial_index", "status")
+VALUE_COLUMNS = ("value", "sem", "cost", "best_so_far")
+STATUSES = ("CANDIDATE", "STAGED", "RUNNING", "COMPLETED", "FAILED", "ABANDONED", "EARLY_STOPPED")
+
+
+def clean_name(name: str) -> str:
+    """The study name reduced to [A-Za-z0-9 _-], as used in its file names."""
+    return "".join(c for c in name if c.isalnum() or c in (' ', '_', '-')).strip()
+
+
+def study_file(directory: str, name: str, suffix: str) -> str:
+    """Path of a per-study file: clean_name(name) plus suffix."""
+    return os.path.join(directory, f"{clean_name(name)}{suffix}")
+
+
+def history_path(directory: str, name: str) -> str:
+    return study_file(directory, name, HISTORY_SUFFIX)
+
+
+def is_current(directory: str, name: str) -> bool:
+    """True if the export exists and is at least as new as every file of the study."""
+    path = history_path(directory, name)
+    if not os.path.exists(path):
+        return False
+    mtime = os.stat(path).st_mtime_ns
+    for suffix in STUDY_SUFFIXES:
+        study = study_file(directory, name, suffix)
+        if os.path.exists(study) and os.stat(study).st_mtime_ns > mtime:
+            return False
+    return True
+
+
+def build(client) -> dict[str, np.ndarray]:
+    """Columns for every trial of an Ax Client's experiment, in trial order."""
+    experiment = client._experiment
+    objective = experiment.optimization_config.objective
+    metric, minimize = objective.metric_names[0], objective.minimize
+    names = list(experiment.search_space.parameters)
+    indices = sorted(experiment.trials)
+    df = experiment.lookup_data().df
+    df = df[df["metric_name"] == metric]
+    means = dict(zip(df["trial_index"], df["mean"]))
+    sems = dict(zip(df["trial_index"], df["sem"]))
+
+    n = len(indices)
+    columns = {
+        "trial_index": np.array(indices, dtype=np.int64),
+        "status": np.array([experiment.trials[i].status.name for i in indices], dtype="U16"),
+    }
+    for p in names:
+        columns[p] = np.full(n, np.nan)
+    columns["value"], columns["sem"] = np.full(n, np.nan), np.full(n, np.nan)
+    columns["cost"] = np.zeros(n)
+    for row, i in enumerate(indices):
+        arm = experiment.trials[i].arm
+        if arm is None:
+            continue
+        for p in names:
+            value = arm.parameters.get(p)
+            columns[p][row] = np.nan if value is None else float(value)
+        if columns["status"][row] == "COMPLETED" and i in means:
+            columns["value"][row] = means[i]
+            columns["sem"][row] = sems[i]
+        if columns["status"][row] in ("COMPLETED", "FAILED"):
+            columns["cost"][row] = eval_cache.trial_cost(metric, experiment.trials[i])
+    values = np.where(np.isnan(columns["value"]), np.inf if minimize else -np.inf, columns["value"])
+    best = np.minimum.accumulate(values) if minimize else np.maximum.accumulate(values)
+    columns["best_so_far"] = np.where(np.isfinite(best), best, np.nan)
+    columns["__meta__"] = np.array(json.dumps({"objective": metric, "minimize": minimize, "parameters": names}))
+    return columns
+
+
+def write(client, path: str) -> tuple[dict, dict[str, np.ndarray]]:
+    """
+    Export the client's history to `path` (atomically; readers never see a partial file).
+    Returns (meta, columns) like read().
+    """
+    columns = build(client)
+    tmp = path + ".tmp"
+    with open(tmp, "wb") as f:
+        np.savez(f, **columns)
+    os.replace(tmp, path)
+    meta = json.loads(str(columns.pop("__meta__")))
+    return meta, columns
+
+
+def read(path: str) -> tuple[dict, dict[str, np.ndarray]]:
+    """(meta, columns) from an exported history file."""
+    with np.load(path, allow_pickle=False) as data:
+        columns = {k: data[k] for k in data.files}
+    meta = json.loads(str(columns.pop("__meta__")))
+    return meta, columns
+
+
+def _stats(column: np.ndarray) -> dict:
+    finite = column[np.isfinite(column)]
+    if not len(finite):
+        return {"n": 0}
+    return {"n": len(finite), "min": finite.min(), "max": finite.max(), "mean": finite.mean(), "std": finite.std()}
+
+
+def summary(meta: dict, columns: dict[str, np.ndarray], names: list[str]) -> dict:
+    """Status counts, the best completed trial and min/max/mean/std of each numeric column in `names`."""
+    status, value = columns["status"], columns["value"]
+    out = {"objective": meta["objective"], "minimize": meta["minimize"], "trials": len(status),
+           "status": {s: int(c) for s, c in zip(*np.unique(status, return_counts=True))}}
+    done = np.flatnonzero(np.isfinite(value))
+    if len(done):
+        best = done[np.argmin(value[done]) if meta["minimize"] else np.argmax(value[done])]
+        out["best"] = {"trial_index": int(columns["trial_index"][best]), "value": value[best],
+                       "parameters": {p: columns[p][best] for p in meta["parameters"]}}
+    out["columns"] = {c: _stats(columns[c]) for c in names if c not in FIXED_COLUMNS and c != "best_so_far"}
+    return out
+
+
+def page(meta: dict, columns: dict[str, np.ndarray], names: list[str] = None, offset: int = 0, limit: int = 20,
+         status: str = None, sort: str = "trial_index") -> dict:
+    """
+    Rows [offset, offset + limit) of the selected columns, optionally filtered to one
+    status and sorted by trial_index (oldest first), "value" (best first) or any other
+    column (ascending). Rows are lists in `columns` order to keep the result small.
+    """
+    available = list(FIXED_COLUMNS) + meta["parameters"] + list(VALUE_COLUMNS)
+    names = names or available
+    unknown = [c for c in names if c not in available]
+    if unknown:
+        raise ValueError(f"Unknown columns {unknown}. Available: {available}.")
+    if sort not in available:
+        raise ValueError(f"Cannot sort by '{sort}'. Available: {available}.")
+    rows = np.arange(len(columns["trial_index"]))
+    if status:
+        if status.upper() not in STATUSES:
+            raise ValueError(f"Unknown status '{status}'. Use one of {list(STATUSES)}.")
+        rows = rows[columns["status"][rows] == status.upper()]
+    if sort != "trial_index":
+        key = columns[sort][rows]
+        if sort == "value" and not meta["minimize"]:
+            key = -key
+        rows = rows[np.argsort(key, kind="stable")]  # NaN (not completed) sorts last
+    selected = rows[offset:offset + limit]
+    out = {"total": len(rows), "offset": offset, "columns": names,
+           "rows": [[columns[c][r] for c in names] for r in selected]}
+    if offset + limit < len(rows):
+        out["next_offset"] = offset + limit
+    return out
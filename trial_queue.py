@@ -0,0 +1,263 @@
+"""
+Durable queue of pending trials for external workers.
+
+The server pushes trials from get_next_trials into a SQLite file next to the
+studies; any number of `python worker.py` processes (on this machine, or on
+other nodes sharing the filesystem) claim them under a lease, keep the lease
+alive with heartbeats while evaluating, and write back the result. The
+Reconciler thread in the server completes or fails the trials in Ax as the
+results come in. A trial whose worker stops heartbeating is handed to another
+worker once its lease expires, up to MAX_ATTEMPTS times, then failed.
+"""
+import os
+import sys
+import json
+import time
+import socket
+import sqlite3
+import threading
+
+import eval_cache
+from metrics import metrics
+
+QUEUE_PATH = os.path.join("ax_experiments", "trial_queue.db")
+LEASE_SECONDS = 60.0
+MAX_ATTEMPTS = 3
+RECONCILE_INTERVAL_SECONDS = 2.0
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS trials (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    study TEXT NOT NULL,
+    trial_index INTEGER NOT NULL,
+    objective TEXT NOT NULL,
+    parameters TEXT NOT NULL,
+    status TEXT NOT NULL DEFAULT 'pending',   -- pending -> running -> done | failed -> reconciled
+    worker TEXT,
+    lease_expires REAL,
+    heartbeat REAL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    value REAL,
+    seconds REAL,
+    cost REAL,
+    error TEXT,
+    created REAL NOT NULL,
+    finished REAL,
+    UNIQUE (study, trial_index)
+);
+CREATE INDEX IF NOT EXISTS trials_status ON trials (status, study);
+"""
+
+
+def worker_id() -> str:
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+class TrialQueue:
+    """
+    SQLite-backed trial queue. Each call opens its own connection and every state
+    change runs in a BEGIN IMMEDIATE transaction, so threads and processes on a
+    shared filesystem can use the same file. The rollback journal (not WAL) is kept
+    because WAL needs shared memory that network filesystems don't provide.
+    """
+    def __init__(self, path: str = QUEUE_PATH, lease_seconds: float = LEASE_SECONDS,
+                 max_attempts: int = MAX_ATTEMPTS):
+        self.path = path
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with self._connect() as db:
+            db.executescript(_SCHEMA)
+
+    def _connect(self) -> sqlite3.Connection:
+        db = sqlite3.connect(self.path, timeout=30.0, isolation_level=None)
+        db.row_factory = sqlite3.Row
+        return db
+
+    def _transaction(self, fn):
+        db = self._connect()
+        try:
+            db.execute("BEGIN IMMEDIATE")
+            try:
+                result = fn(db)
+            except BaseException:
+                db.execute("ROLLBACK")
+                raise
+            db.execute("COMMIT")
+            return result
+        finally:
+            db.close()
+
+    def push(self, study: str, objective: str, trials: dict[int, dict]) -> int:
+        """
+        Queue the output of get_next_trials ({trial_index: parameters}); returns how many
+        were added. Raises (and queues nothing) if any of the trials is already queued.
+        """
+        now = time.time()
+        rows = [(study, i, objective, json.dumps(p), now) for i, p in trials.items()]
+        def insert(db):
+            added = db.executemany(
+                "INSERT OR IGNORE INTO trials (study, trial_index, objective, parameters, created) "
+                "VALUES (?, ?, ?, ?, ?)", rows).rowcount
+            if added != len(rows):
+                raise ValueError(f"{len(rows) - added} of the trials of '{study}' are already on the queue "
+                                 f"(left over from an earlier study of that name?).")
+            return added
+        return self._transaction(insert)
+
+    def forget(self, study: str) -> int:
+        """Delete every row of `study` (it was archived or re-created); returns how many."""
+        return self._transaction(lambda db: db.execute("DELETE FROM trials WHERE study = ?", (study,)).rowcount)
+
+    def claim(self, worker: str, studies: list[str] = None) -> dict | None:
+        """
+        Lease the oldest pending trial (or a running one whose lease expired) to `worker`.
+        Returns the trial as a dict, or None if there is nothing to do.
+        """
+        def claim_one(db):
+            now = time.time()
+            self._fail_exhausted(db, now)
+            query = ("SELECT * FROM trials WHERE (status = 'pending' OR (status = 'running' AND lease_expires < ?))")
+            args = [now]
+            if studies:
+                query += f" AND study IN ({','.join('?' * len(studies))})"
+                args += studies
+            row = db.execute(query + " ORDER BY id LIMIT 1", args).fetchone()
+            if row is None:
+                return None
+            trial = dict(row)
+            trial.update(status="running", worker=worker, lease_expires=now + self.lease_seconds, heartbeat=now,
+                         attempts=row["attempts"] + 1)
+            db.execute("UPDATE trials SET status = ?, worker = ?, lease_expires = ?, heartbeat = ?, attempts = ?"
+                       " WHERE id = ?", (trial["status"], worker, trial["lease_expires"], now, trial["attempts"],
+                                         row["id"]))
+            trial["parameters"] = json.loads(trial["parameters"])
+            return trial
+        return self._transaction(claim_one)
+
+    def _fail_exhausted(self, db, now: float):
+        """Expired leases that already used up max_attempts are failed instead of re-leased."""
+        db.execute("UPDATE trials SET status = 'failed', finished = ?, error = ? "
+                   "WHERE status = 'running' AND lease_expires < ? AND attempts >= ?",
+                   (now, f"lease expired {self.max_attempts} times", now, self.max_attempts))
+
+    def heartbeat(self, trial_id: int, worker: str) -> bool:
+        """Extend the lease; False if the trial is no longer ours (expired and re-leased, or cancelled)."""
+        now = time.time()
+        return self._transaction(lambda db: db.execute(
+            "UPDATE trials SET lease_expires = ?, heartbeat = ? WHERE id = ? AND worker = ? AND status = 'running'",
+            (now + self.lease_seconds, now, trial_id, worker)).rowcount == 1)
+
+    def report(self, trial_id: int, worker: str, value: float = None, seconds: float = None,
+               cost: float = None, error: str = None) -> bool:
+        """Store a result; ignored (returns False) if the lease was lost in the meantime."""
+        status = "failed" if error is not None else "done"
+        return self._transaction(lambda db: db.execute(
+            "UPDATE trials SET status = ?, value = ?, seconds = ?, cost = ?, error = ?, finished = ? "
+            "WHERE id = ? AND worker = ? AND status = 'running'",
+            (status, value, seconds, cost, error, time.time(), trial_id, worker)).rowcount == 1)
+
+    def results(self) -> dict[str, list[dict]]:
+        """Finished (done or failed) trials not yet applied to Ax, grouped by study."""
+        def collect(db):
+            self._fail_exhausted(db, time.time())
+            return db.execute("SELECT * FROM trials WHERE status IN ('done', 'failed') ORDER BY id").fetchall()
+        grouped = {}
+        for row in self._transaction(collect):
+            grouped.setdefault(row["study"], []).append(dict(row))
+        return grouped
+
+    def mark_reconciled(self, ids: list[int]):
+        self._transaction(lambda db: db.executemany(
+            "UPDATE trials SET status = 'reconciled' WHERE id = ?", [(i,) for i in ids]))
+
+    def status(self, study: str = None) -> dict:
+        """Trial counts per queue status, plus the workers currently holding leases."""
+        db = self._connect()
+        try:
+            where, args = ("WHERE study = ?", [study]) if study else ("", [])
+            counts = {row[0]: row[1] for row in db.execute(
+                f"SELECT status, COUNT(*) FROM trials {where} GROUP BY status", args)}
+            now = time.time()
+            workers = [dict(row) for row in db.execute(
+                "SELECT worker, COUNT(*) AS trials, MAX(heartbeat) AS last_heartbeat FROM trials "
+                f"WHERE status = 'running' AND lease_expires >= ? {'AND study = ?' if study else ''} GROUP BY worker",
+                [now] + args)]
+            for w in workers:
+                w["seconds_since_heartbeat"] = round(now - w.pop("last_heartbeat"), 1)
+            return {"counts": counts, "workers": workers}
+        finally:
+            db.close()
+
+
+class Reconciler:
+    """
+    Background thread that applies finished queue results to the Ax clients:
+    complete_trial for results, mark_trial_failed for errors. Each study is updated
+    under its study lock and written to disk once per pass, before its rows are marked
+    reconciled; a study that fails to load is skipped until the next pass. `manager`
+    may be a zero-argument callable returning the AxStateManager (like JobManager), so
+    Ax is only loaded once there is something to reconcile.
+    """
+    def __init__(self, manager, queue: TrialQueue, interval: float = RECONCILE_INTERVAL_SECONDS):
+        self._manager = manager
+        self.queue = queue
+        self.interval = interval
+        self.reconciled = 0
+        self._stop = threading.Event()
+        self._thread = None
+
+    @property
+    def manager(self):
+        return self._manager() if callable(self._manager) else self._manager
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._loop, name="trial-reconciler", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def _loop(self):
+        while not self._stop.wait(self.interval):
+            try:
+                self.reconcile()
+            except Exception as e:
+                print(f"[trial_queue] reconcile failed: {e}", file=sys.stderr)
+
+    def reconcile(self, study: str = None) -> int:
+        """Apply pending results (of one study, or all); returns how many trials were updated."""
+        applied = 0
+        for name, rows in self.queue.results().items():
+            if study is not None and name != study:
+                continue
+            manager = self.manager
+            try:
+                with metrics.tool_call("reconcile", name), manager.study_lock(name):
+                    client = manager.load_client(name)
+                    for row in rows:
+                        try:
+                            if row["status"] == "done":
+                                client.complete_trial(trial_index=row["trial_index"],
+                                                      raw_data={row["objective"]: row["value"]})
+                            else:
+                                if row["cost"] is None:  # lease ran out every time; never evaluated
+                                    client._experiment.trials[row["trial_index"]].update_run_metadata(
+                                        {eval_cache.NOT_EVALUATED_METADATA_KEY: True})
+                                client.mark_trial_failed(trial_index=row["trial_index"])
+                                metrics.incr("trial_failed")
+                        except Exception as e:
+                            # e.g. the trial was already completed some other way; don't retry forever
+                            print(f"[trial_queue] {name} trial {row['trial_index']}: {e}", file=sys.stderr)
+                    # on disk before the rows are marked reconciled, so a crash can't lose them
+                    manager.save_client(name, client, flush=True)
+            except Exception as e:
+                # leave this study's rows for the next pass and go on with the others
+                print(f"[trial_queue] reconcile {name} failed: {e}", file=sys.stderr)
+                continue
+            self.queue.mark_reconciled([row["id"] for row in rows])
+            metrics.incr("queue_reconciled", name, len(rows))
+            applied += len(rows)
+        self.reconciled += applied
+        return applied
@@ -0,0 +1,76 @@
+"""
+Trial worker: claims trials from the queue written by enqueue_trials, evaluates
+them and reports the results. Run as many as you like, on any machine that sees
+the same queue file; the server reconciles the results into the Ax studies.
+
+    python worker.py                          # work until interrupted
+    python worker.py --study my_study --idle-exit 30
+"""
+import sys
+import time
+import argparse
+import threading
+
+import benchmarks
+from trial_queue import TrialQueue, QUEUE_PATH, LEASE_SECONDS, MAX_ATTEMPTS, worker_id
+
+
+def evaluate_with_heartbeat(queue: TrialQueue, trial: dict, worker: str, interval: float):
+    """Evaluate in a helper thread while this thread keeps the lease alive."""
+    result = {}
+
+    def run():
+        try:
+            result["value"], result["seconds"] = benchmarks.timed_evaluate(trial["objective"], trial["parameters"])
+        except Exception as e:
+            result["error"] = str(e)
+
+    thread = threading.Thread(target=run, daemon=True)
+    thread.start()
+    while True:
+        thread.join(interval)
+        if not thread.is_alive():
+            return result
+        if not queue.heartbeat(trial["id"], worker):
+            return None  # lease lost; someone else owns the trial now
+
+
+def main(args):
+    queue = TrialQueue(args.queue, lease_seconds=args.lease, max_attempts=args.max_attempts)
+    worker = args.worker or worker_id()
+    done, idle_since = 0, time.monotonic()
+    print(f"[worker {worker}] polling {args.queue}", file=sys.stderr)
+    while args.max_trials is None or done < args.max_trials:
+        trial = queue.claim(worker, args.study or None)
+        if trial is None:
+            if args.idle_exit is not None and time.monotonic() - idle_since > args.idle_exit:
+                break
+            time.sleep(args.poll)
+            continue
+        result = evaluate_with_heartbeat(queue, trial, worker, args.heartbeat)
+        if result is None:
+            print(f"[worker {worker}] lost the lease on {trial['study']} trial {trial['trial_index']}",
+                  file=sys.stderr)
+        else:
+            queue.report(trial["id"], worker, value=result.get("value"), seconds=result.get("seconds"),
+                         cost=benchmarks.evaluation_cost(trial["objective"], trial["parameters"]),
+                         error=result.get("error"))
+            print(f"[worker {worker}] {trial['study']} trial {trial['trial_index']}: "
+                  f"{result.get('error') or result['value']}", file=sys.stderr)
+        done += 1
+        idle_since = time.monotonic()
+    print(f"[worker {worker}] exiting after {done} trials", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--queue", default=QUEUE_PATH, help="queue file (shared with the server)")
+    parser.add_argument("--study", nargs="*", help="only take trials from these studies")
+    parser.add_argument("--worker", help="worker name (default: host:pid)")
+    parser.add_argument("--lease", type=float, default=LEASE_SECONDS, help="seconds a claim is valid without a heartbeat")
+    parser.add_argument("--heartbeat", type=float, default=LEASE_SECONDS / 4, help="seconds between heartbeats")
+    parser.add_argument("--max-attempts", type=int, default=MAX_ATTEMPTS)
+    parser.add_argument("--poll", type=float, default=1.0, help="seconds between polls when the queue is empty")
+    parser.add_argument("--idle-exit", type=float, help="exit after this many idle seconds")
+    parser.add_argument("--max-trials", type=int, help="exit after this many trials")
+    main(parser.parse_args())